@@ -0,0 +1,312 @@
+from src.board import Board
+from src.game_record import GameRecord, GameRecordWriter
+from src.heuristicFinder import HeuristicFinder
+from src.minimax import MiniMax
+from src.parallel_search import ParallelMiniMax
+from src.transposition_table import TranspositionTable
+import argparse
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+__author__ = 'Bill'
+
+
+class RandomPlayer:
+    """
+    Plays a random legal column.
+    """
+
+    def __init__(self, piece, opponent, seed=None):
+        """
+        :param piece: this player's piece value.
+        :param opponent: the opponent's piece value.
+        :param seed: the seed for the random number generator.
+        """
+        self.piece = piece
+        self.random = random.Random(seed)
+
+    def choose(self, board):
+        """
+        :param board: the game board.
+        :return: the chosen column and the number of nodes searched.
+        """
+        return self.random.choice(board.legal_moves()), 0
+
+
+class GreedyPlayer:
+    """
+    Plays the column with the best heuristic value after a single move.
+    """
+
+    def __init__(self, piece, opponent, seed=None):
+        """
+        :param piece: this player's piece value.
+        :param opponent: the opponent's piece value.
+        :param seed: unused, greedy players always play the same way.
+        """
+        self.piece = piece
+        self.heuristic_finder = HeuristicFinder(opponent, piece)
+
+    def choose(self, board):
+        """
+        :param board: the game board.
+        :return: the chosen column and the number of nodes searched.
+        """
+        best_col = None
+        best = None
+        nodes = 0
+        for col in board.legal_moves():
+            board.drop(self.piece, col)
+            nodes += 1
+            value = self.heuristic_finder.heuristic(board)
+            board.undo()
+            if best is None or value > best:
+                best = value
+                best_col = col
+        return best_col, nodes
+
+
+class MiniMaxPlayer:
+    """
+    Plays the move found by MiniMax's iterative deepening search.
+    """
+
+    def __init__(self, piece, opponent, seed=None, time_budget_ms=MiniMax.DEFAULT_TIME_BUDGET_MS,
+                 max_depth=MiniMax.DEFAULT_MAX_DEPTH, table_size=TranspositionTable.DEFAULT_SIZE):
+        """
+        :param piece: this player's piece value.
+        :param opponent: the opponent's piece value.
+        :param seed: unused, the search always plays the same way given the same time.
+        :param time_budget_ms: the time allowed for each move in milliseconds.
+        :param max_depth: the deepest iteration to search.
+        :param table_size: the number of transposition table slots.
+        """
+        self.piece = piece
+        self.time_budget_ms = time_budget_ms
+        self.max_depth = max_depth
+        self.minimax = MiniMax(opponent, piece, TranspositionTable(table_size))
+
+    def choose(self, board):
+        """
+        :param board: the game board.
+        :return: the chosen column and the number of nodes searched.
+        """
+        result = self.minimax.search(board, self.time_budget_ms, self.max_depth)
+        return result.get_best_col(), result.nodes
+
+
+class ParallelPlayer:
+    """
+    Plays the move found by ParallelMiniMax's fixed depth search on several processes.
+    """
+
+    # Class Constants
+    DEFAULT_DEPTH = 6  # Depth searched for each move.
+
+    def __init__(self, piece, opponent, seed=None, depth=DEFAULT_DEPTH, workers=0):
+        """
+        :param piece: this player's piece value.
+        :param opponent: the opponent's piece value.
+        :param seed: unused, the search always plays the same way.
+        :param depth: the depth searched for each move.
+        :param workers: the number of worker processes, or 0 for one per CPU core.
+        """
+        self.piece = piece
+        self.depth = depth
+        self.parallel = ParallelMiniMax(opponent, piece, workers or None)
+
+    def choose(self, board):
+        """
+        :param board: the game board.
+        :return: the chosen column and the number of nodes searched.
+        """
+        result = self.parallel.search(board, self.depth)
+        return result.get_best_col(), result.nodes
+
+    def close(self):
+        """
+        Shut down the worker processes.
+        """
+        self.parallel.close()
+
+
+class Arena:
+    """
+    Plays engine configurations against each other without a display, using only the
+    Board, MiniMax and HeuristicFinder. Games are spread over a process pool and each
+    finished game is written as a line of JSON as soon as it is done.
+
+    A player is described by a spec string: a player type, optionally followed by a
+    colon and comma separated settings, for example "random", "greedy",
+    "minimax:max_depth=4,time_budget_ms=200" or "parallel:depth=6,workers=4".
+    """
+
+    # Class Constants
+    PLAYER_TYPES = {"random": RandomPlayer, "greedy": GreedyPlayer, "minimax": MiniMaxPlayer,
+                    "parallel": ParallelPlayer}
+
+    def __init__(self, first_spec, second_spec, workers=None, swap_colors=True, seed=0):
+        """
+        Set up the arena.
+        :param first_spec: the spec of the first player.
+        :param second_spec: the spec of the second player.
+        :param workers: the number of worker processes, or None for one per CPU core.
+        :param swap_colors: alternate which player is red, who moves first, from game to game.
+        :param seed: the seed for the random players, offset by the game number.
+        """
+        self.parse_spec(first_spec)  # Fail early on a bad spec.
+        self.parse_spec(second_spec)
+        self.first_spec = first_spec
+        self.second_spec = second_spec
+        self.workers = workers
+        self.swap_colors = swap_colors
+        self.seed = seed
+
+    @staticmethod
+    def parse_spec(spec):
+        """
+        :param spec: a player spec string.
+        :return: the player class and a dictionary of its settings.
+        """
+        name, _, settings_text = spec.partition(":")
+        if name not in Arena.PLAYER_TYPES:
+            raise ValueError("Unknown player type '" + name + "' in spec '" + spec + "'")
+        settings = {}
+        if settings_text:
+            for setting in settings_text.split(","):
+                key, _, value = setting.partition("=")
+                settings[key.strip()] = int(value)
+        return Arena.PLAYER_TYPES[name], settings
+
+    @staticmethod
+    def create_player(spec, piece, opponent, seed):
+        """
+        :param spec: a player spec string.
+        :param piece: the player's piece value.
+        :param opponent: the opponent's piece value.
+        :param seed: the seed for the player's random number generator.
+        :return: a player for the spec.
+        """
+        player_class, settings = Arena.parse_spec(spec)
+        return player_class(piece, opponent, seed, **settings)
+
+    @staticmethod
+    def play_game(game, red_spec, black_spec, seed):
+        """
+        Play a single game. Runs in a worker process.
+        :param game: the game number.
+        :param red_spec: the spec of the player moving first.
+        :param black_spec: the spec of the player moving second.
+        :param seed: the seed for the players' random number generators.
+        :return: a dictionary describing the game.
+        """
+        players = {
+            Board.PLAYER_ONE: Arena.create_player(red_spec, Board.PLAYER_ONE, Board.PLAYER_TWO, seed),
+            Board.PLAYER_TWO: Arena.create_player(black_spec, Board.PLAYER_TWO, Board.PLAYER_ONE, seed + 1),
+        }
+        board = Board()
+        control = Board.PLAYER_ONE
+        moves = []
+        times_ms = []
+        nodes = []
+        winner = None
+        try:
+            while winner is None and not board.is_filled():
+                start = time.perf_counter()
+                col, move_nodes = players[control].choose(board)
+                times_ms.append((time.perf_counter() - start) * 1000.0)
+                nodes.append(move_nodes)
+                moves.append(col)
+                board.drop(control, col)
+                winner = board.winner_after_last_move()
+                control = Board.OPPONENT[control]
+        finally:
+            for player in players.values():
+                if hasattr(player, "close"):
+                    player.close()
+        return {"game": game, "red": red_spec, "black": black_spec, "winner": winner, "moves": moves,
+                "move_times_ms": times_ms, "move_nodes": nodes}
+
+    def games(self, count):
+        """
+        :param count: the number of games.
+        :return: a list of (game, red spec, black spec, seed) for each game to play.
+        """
+        games = []
+        for game in range(0, count):
+            if self.swap_colors and game % 2 == 1:
+                games.append((game, self.second_spec, self.first_spec, self.seed + 2 * game))
+            else:
+                games.append((game, self.first_spec, self.second_spec, self.seed + 2 * game))
+        return games
+
+    def run(self, count, out, recorder=None):
+        """
+        Play games and write each one to a file as a line of JSON as it finishes.
+        :param count: the number of games to play.
+        :param out: a writable text file.
+        :param recorder: a GameRecordWriter to also write each game to, or None.
+        :return: a dictionary with the number of games, first_wins, second_wins and draws.
+        """
+        summary = {"games": 0, "first_wins": 0, "second_wins": 0, "draws": 0}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for game in self.games(count):
+                first_is_red = not (self.swap_colors and game[0] % 2 == 1)
+                futures[executor.submit(Arena.play_game, *game)] = first_is_red
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                record["first_is_red"] = futures[future]
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                if recorder is not None:
+                    result = GameRecord.DRAW if record["winner"] is None else record["winner"]
+                    recorder.write_game(GameRecord(Board.PLAYER_ONE, record["moves"], result))
+                summary["games"] += 1
+                if record["winner"] is None:
+                    summary["draws"] += 1
+                elif (record["winner"] == Board.PLAYER_ONE) == record["first_is_red"]:
+                    summary["first_wins"] += 1
+                else:
+                    summary["second_wins"] += 1
+        return summary
+
+    @staticmethod
+    def main(argv=None):
+        """
+        Run the arena from the command line.
+        :param argv: the command line arguments, or None for sys.argv.
+        """
+        parser = argparse.ArgumentParser(description="Play Connect 5 engines against each other.")
+        parser.add_argument("first", help="spec of the first player, e.g. minimax:max_depth=4,time_budget_ms=200")
+        parser.add_argument("second", help="spec of the second player, e.g. random or greedy")
+        parser.add_argument("--games", type=int, default=100, help="number of games to play")
+        parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per core")
+        parser.add_argument("--seed", type=int, default=0, help="seed for the random players")
+        parser.add_argument("--no-swap", action="store_true", help="always give the first player red")
+        parser.add_argument("--out", default="-", help="JSONL file to write games to, default stdout")
+        parser.add_argument("--record", default=None, help="game record file to add the games to")
+        args = parser.parse_args(argv)
+
+        arena = Arena(args.first, args.second, args.workers, not args.no_swap, args.seed)
+        try:
+            recorder = GameRecordWriter(args.record) if args.record else None
+        except ValueError as error:
+            parser.error(str(error) + ", use another --record file")
+        try:
+            if args.out == "-":
+                summary = arena.run(args.games, sys.stdout, recorder)
+            else:
+                with open(args.out, "w") as out:
+                    summary = arena.run(args.games, out, recorder)
+        finally:
+            if recorder is not None:
+                recorder.close()
+        sys.stderr.write(json.dumps(summary) + "\n")
+
+
+if __name__ == "__main__":
+    Arena.main()
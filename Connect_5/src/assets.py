@@ -0,0 +1,67 @@
+import os
+import pygame
+
+__author__ = 'Bill'
+
+
+class Assets:
+    """
+    Loads the game's images and sounds the first time they are used and keeps them for
+    the rest of the game. Images are converted to the display's pixel format as they are
+    loaded, with convert_alpha() for images with transparency and convert() for the
+    rest, so every blit after that is a straight copy. Converting needs the window to be
+    open, so nothing is loaded before the first draw. Paths are found from this file, so
+    the game can be started from any folder, and without an audio device sounds are
+    skipped instead of stopping the game.
+    """
+
+    # Class Constants
+    ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    IMG_DIR = os.path.join(ROOT, "img")  # Folder holding the image files.
+    SFX_DIR = os.path.join(ROOT, "sfx")  # Folder holding the sound files.
+
+    def __init__(self):
+        """
+        Create an empty asset cache.
+        """
+        self.images = {}  # Converted surfaces, keyed by file name.
+        self.sounds = {}  # Sounds, or None where they could not be loaded, keyed by file name.
+
+    def image(self, name):
+        """
+        :param name: the file name of an image in IMG_DIR.
+        :return: the image as a surface in the display's pixel format, loaded on first use.
+        """
+        surface = self.images.get(name)
+        if surface is None:
+            surface = pygame.image.load(os.path.join(self.IMG_DIR, name))
+            if surface.get_flags() & pygame.SRCALPHA:
+                surface = surface.convert_alpha()
+            else:
+                surface = surface.convert()
+            self.images[name] = surface
+        return surface
+
+    def sound(self, name):
+        """
+        :param name: the file name of a sound in SFX_DIR.
+        :return: the sound, loaded on first use, or None if there is no audio device.
+        """
+        if name not in self.sounds:
+            sound = None
+            if pygame.mixer.get_init():
+                try:
+                    sound = pygame.mixer.Sound(os.path.join(self.SFX_DIR, name))
+                except pygame.error:
+                    sound = None
+            self.sounds[name] = sound
+        return self.sounds[name]
+
+    def play(self, name):
+        """
+        Play a sound, if it could be loaded.
+        :param name: the file name of a sound in SFX_DIR.
+        """
+        sound = self.sound(name)
+        if sound is not None:
+            sound.play()
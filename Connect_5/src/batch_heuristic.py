@@ -0,0 +1,226 @@
+from src.board import Board
+from src.heuristicFinder import HeuristicFinder
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed for batch evaluation.
+    numpy = None
+
+__author__ = 'Bill'
+
+
+class BatchHeuristicFinder:
+    """
+    Scores many Connect 5 boards at once with numpy. Boards are given as an
+    (N, columns, rows) array of int8 codes indexed by board, column and row, where row 0
+    is the top row like Board.piece_at, or as a list of Boards. Every count is found by
+    lining up shifted slices of the whole batch, and the results match HeuristicFinder
+    and Board's own methods board for board.
+
+    A finder scores boards of one geometry, the default board unless another is given.
+    Boards or arrays of any other size raise ValueError. The win length of an array
+    can't be checked, so it is taken to be the geometry's.
+    """
+
+    # Piece Codes
+    BLANK_CODE = 0
+    PLAYER_ONE_CODE = 1
+    PLAYER_TWO_CODE = 2
+    CODES = {Board.BLANK_SPACE: BLANK_CODE, Board.PLAYER_ONE: PLAYER_ONE_CODE, Board.PLAYER_TWO: PLAYER_TWO_CODE}
+
+    # Each direction is (column step, row step).
+    DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+    DISCONNECTED_DIRECTIONS = ((1, 0), (1, 1), (1, -1))  # Disconnected wins are not vertical.
+
+    def __init__(self, human_player, ai_player, geometry=Board.GEOMETRY):
+        """
+        Create a BatchHeuristicFinder object.
+        :param human_player: the piece value for the human player
+        :param ai_player: the piece value for the ai player
+        :param geometry: the (width, height, win length) of the boards to score.
+        """
+        if numpy is None:
+            raise ImportError("BatchHeuristicFinder requires numpy.")
+        self.ai_player = ai_player
+        self.human_player = human_player
+        self.geometry = tuple(geometry)
+        self.board_class = Board.for_geometry(*self.geometry)
+        # The (column, row, bonus) of each vital cell, from the bits HeuristicFinder weights.
+        self.position_weights = []
+        for bit, bonus in HeuristicFinder.position_weights(self.board_class):
+            index = bit.bit_length() - 1
+            col = index // self.board_class.COLUMN_BITS
+            row = self.board_class.get_height() - 1 - index % self.board_class.COLUMN_BITS
+            self.position_weights.append((col, row, bonus))
+
+    @staticmethod
+    def to_array(boards, geometry=Board.GEOMETRY):
+        """
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :param geometry: the (width, height, win length) the boards must have.
+        :return: the boards as an (N, columns, rows) int8 array of piece codes.
+        """
+        width, height = geometry[0], geometry[1]
+        if isinstance(boards, numpy.ndarray):
+            if boards.ndim != 3 or boards.shape[1:] != (width, height):
+                raise ValueError("Expected an (N, " + str(width) + ", " + str(height) + ") array, got " +
+                                 str(boards.shape))
+            return boards.astype(numpy.int8, copy=False)
+        array = numpy.zeros((len(boards), width, height), dtype=numpy.int8)
+        for i, board in enumerate(boards):
+            if board.get_geometry() != tuple(geometry):
+                raise ValueError("Expected boards of geometry " + str(tuple(geometry)) + ", got " +
+                                 str(board.get_geometry()))
+            for col in range(0, width):
+                for row in range(0, height):
+                    array[i, col, row] = BatchHeuristicFinder.CODES[board.piece_at(row, col)]
+        return array
+
+    @staticmethod
+    def window_slice(cells, d_col, d_row, n, k):
+        """
+        :param cells: an (N, columns, rows) array.
+        :param d_col: the column step of the direction.
+        :param d_row: the row step of the direction.
+        :param n: the number of cells in each window.
+        :param k: the position in the window.
+        :return: the k-th cell of every n cell window in the direction, as an array indexed by
+            board and the window's first cell.
+        """
+        columns = cells.shape[1] - (n - 1) * d_col
+        rows = cells.shape[2] - (n - 1) * abs(d_row)
+        col_start = k * d_col
+        row_start = k * d_row + (n - 1 if d_row < 0 else 0)
+        return cells[:, col_start:col_start + columns, row_start:row_start + rows]
+
+    def filled_windows(self, cells, d_col, d_row, n):
+        """
+        :param cells: an (N, columns, rows) boolean array.
+        :param d_col: the column step of the direction.
+        :param d_row: the row step of the direction.
+        :param n: the number of cells in each window.
+        :return: a boolean array indexed by board and window start, true where all n cells are set.
+        """
+        result = self.window_slice(cells, d_col, d_row, n, 0)
+        for k in range(1, n):
+            result = result & self.window_slice(cells, d_col, d_row, n, k)
+        return result
+
+    def n_in_a_row(self, boards, piece, n):
+        """
+        Batch version of Board.find_n_in_a_row.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :param piece: the value of the piece.
+        :param n: Look for n in_a_row
+        :return: an array of the number of n in_a_row for the piece on each board.
+        """
+        cells = self.to_array(boards, self.geometry) == self.CODES[piece]
+        count = numpy.zeros(cells.shape[0], dtype=numpy.int64)
+        for d_col, d_row in self.DIRECTIONS:
+            if (n - 1) * d_col < cells.shape[1] and (n - 1) * abs(d_row) < cells.shape[2]:
+                count += self.filled_windows(cells, d_col, d_row, n).sum(axis=(1, 2))
+        return count
+
+    def run_counts(self, boards, piece, n):
+        """
+        Batch version of Board.get_run_count, which counts nothing for runs it doesn't track.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :param piece: the value of the piece.
+        :param n: the run length.
+        :return: an array of the number of n in_a_row for the piece on each board, or zeros if n is
+            not in the geometry's TRACKED_RUNS.
+        """
+        if n not in self.board_class.TRACKED_RUNS:
+            return numpy.zeros(len(boards), dtype=numpy.int64)
+        return self.n_in_a_row(boards, piece, n)
+
+    def winners(self, boards):
+        """
+        Batch version of Board.find_winner.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :return: an array of the winner's piece code on each board, or BLANK_CODE where there is no winner.
+        """
+        array = self.to_array(boards, self.geometry)
+        result = numpy.full(array.shape[0], self.BLANK_CODE, dtype=numpy.int8)
+        player_two_wins = self.n_in_a_row(array, Board.PLAYER_TWO, self.board_class.SCORE_TO_WIN) > 0
+        player_one_wins = self.n_in_a_row(array, Board.PLAYER_ONE, self.board_class.SCORE_TO_WIN) > 0
+        result[player_two_wins] = self.PLAYER_TWO_CODE
+        result[player_one_wins] = self.PLAYER_ONE_CODE  # Player one is checked first, like find_winner.
+        return result
+
+    def disconnected_wins(self, boards, piece):
+        """
+        Batch version of Board.find_disconnected_wins.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :param piece: the player piece
+        :return: an array of the number of unconnected wins for the piece on each board.
+        """
+        array = self.to_array(boards, self.geometry)
+        pieces = array == self.CODES[piece]
+        blanks = array == self.BLANK_CODE
+        n = self.board_class.DISCONNECTED_LENGTH
+        count = numpy.zeros(array.shape[0], dtype=numpy.int64)
+        for d_col, d_row in self.DISCONNECTED_DIRECTIONS:
+            fills = numpy.zeros(array.shape, dtype=bool)  # Each blank cell counts once per direction.
+            for k in range(0, n):
+                # Windows where the k-th cell is blank and the rest are the player's pieces.
+                window = self.window_slice(blanks, d_col, d_row, n, k).copy()
+                for other in range(0, n):
+                    if other != k:
+                        window &= self.window_slice(pieces, d_col, d_row, n, other)
+                self.window_slice(fills, d_col, d_row, n, k)[...] |= window
+            count += fills.sum(axis=(1, 2))
+        return count
+
+    def heuristic(self, boards):
+        """
+        Batch version of HeuristicFinder.heuristic.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :return: an array of the heuristic value of each board.
+        """
+        array = self.to_array(boards, self.geometry)
+        ai_code = self.CODES[self.ai_player]
+        human_code = self.CODES[self.human_player]
+
+        # Runs one, two and three pieces short of a win, like HeuristicFinder.
+        win_length = self.board_class.SCORE_TO_WIN
+        ai_threats = (self.run_counts(array, self.ai_player, win_length - 1) +
+                      self.disconnected_wins(array, self.ai_player))
+        human_threats = (self.run_counts(array, self.human_player, win_length - 1) +
+                         self.disconnected_wins(array, self.human_player))
+        heuristic = (50 * ai_threats + 10 * self.run_counts(array, self.ai_player, win_length - 2) +
+                     0.5 * self.run_counts(array, self.ai_player, win_length - 3))
+        heuristic -= (50 * human_threats + 10 * self.run_counts(array, self.human_player, win_length - 2) +
+                      0.5 * self.run_counts(array, self.human_player, win_length - 3))
+
+        # Values for center and corners, vital pieces
+        bonus = numpy.zeros(array.shape[0], dtype=numpy.int64)
+        for col, row, value in self.position_weights:
+            piece = array[:, col, row]
+            bonus += numpy.where(piece == ai_code, value, 0)
+            bonus -= numpy.where(piece == human_code, value, 0)
+        heuristic += bonus
+
+        winners = self.winners(array)
+        heuristic[winners == human_code] = -10000
+        heuristic[winners == ai_code] = 10000
+        heuristic[(array != self.BLANK_CODE).all(axis=(1, 2))] = 0
+        return heuristic
+
+    def evaluate(self, boards):
+        """
+        Find everything the heuristic is made of for every board.
+        :param boards: an (N, columns, rows) array of piece codes, or a list of Boards.
+        :return: a dictionary of arrays: 'winner' and 'heuristic', plus 'n_in_a_row' and
+            'disconnected_wins' dictionaries keyed by piece, with 'n_in_a_row' further keyed by n
+            for each n in the geometry's TRACKED_RUNS.
+        """
+        array = self.to_array(boards, self.geometry)
+        result = {"winner": self.winners(array), "heuristic": self.heuristic(array),
+                  "n_in_a_row": {}, "disconnected_wins": {}}
+        for piece in (self.ai_player, self.human_player):
+            result["n_in_a_row"][piece] = {}
+            for n in self.board_class.TRACKED_RUNS:
+                result["n_in_a_row"][piece][n] = self.n_in_a_row(array, piece, n)
+            result["disconnected_wins"][piece] = self.disconnected_wins(array, piece)
+        return result
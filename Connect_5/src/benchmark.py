@@ -0,0 +1,281 @@
+from src.board import Board
+from src.board_node import BoardNode
+from src.heuristicFinder import HeuristicFinder
+from src.minimax import MiniMax
+import argparse
+import json
+import platform
+import sys
+import time
+
+__author__ = 'Bill'
+
+
+class BenchmarkSuite:
+    """
+    Times the Board, HeuristicFinder and MiniMax hot paths on a fixed set of positions,
+    so results can be compared from one change to the next. Each benchmark reports
+    operations per second, and searches also report nodes per second. Results can be
+    saved as JSON and compared with a saved baseline, where any benchmark that slowed
+    down by more than the threshold counts as a regression.
+    """
+
+    # Positions as the columns played from an empty board, red first. None of them are won.
+    CORPUS = {
+        "opening": [
+            [2, 1, 4, 1],
+            [0, 1, 1, 5, 2, 4],
+        ],
+        "midgame": [
+            [3, 8, 2, 5, 7, 1, 0, 7, 4, 8, 3, 3, 7, 8, 8, 7, 6, 2, 3, 2],
+            [3, 4, 1, 6, 7, 2, 1, 1, 0, 6, 8, 4, 0, 3, 8, 8, 5, 4, 2, 1, 4, 3, 0, 4],
+        ],
+        "tactical": [  # A player can win with their next piece.
+            [4, 5, 8, 0, 7, 3, 0, 2, 1, 5, 7, 3, 6, 8, 1, 3, 0, 3, 6, 4, 2, 6],
+            [3, 2, 4, 0, 6, 8, 7, 1, 7, 3, 1, 5, 5, 2, 3, 5, 2, 0, 1, 1, 0, 7, 7, 1, 0, 8, 2, 1, 2, 4],
+        ],
+        "near_full": [
+            [4, 6, 2, 8, 1, 4, 8, 2, 1, 3, 5, 1, 8, 1, 0, 3, 7, 8, 6, 5, 7, 7, 5, 4, 3, 2,
+             3, 1, 4, 8, 7, 5, 7, 4, 1, 1, 7, 3, 6, 3, 8, 7, 0, 6, 0, 8, 5, 5, 3, 4, 4, 6],
+            [1, 1, 8, 8, 5, 2, 8, 7, 2, 1, 3, 0, 2, 5, 6, 1, 4, 5, 5, 5, 0, 7, 3, 0, 0, 2,
+             2, 5, 6, 7, 1, 1, 3, 3, 7, 7, 2, 6, 1, 2, 6, 7, 5, 8, 3, 8, 6, 7, 0, 6, 8, 6, 4, 8, 0],
+        ],
+    }
+
+    DEFAULT_SEARCH_DEPTHS = (3, 4, 5, 6, 7)
+    DEFAULT_MIN_TIME = 0.2  # Seconds each timing run lasts at least.
+    DEFAULT_REPEAT = 3  # Timing runs per benchmark, the fastest is kept.
+    DEFAULT_THRESHOLD = 0.10  # Slowdown, as a fraction, that counts as a regression.
+
+    def __init__(self, search_depths=DEFAULT_SEARCH_DEPTHS, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+        """
+        Set up the suite.
+        :param search_depths: the depths to run full searches at.
+        :param min_time: the least time in seconds each timing run lasts.
+        :param repeat: the number of timing runs for each benchmark.
+        """
+        self.search_depths = search_depths
+        self.min_time = min_time
+        self.repeat = repeat
+        self.boards = {}
+        for category, positions in self.CORPUS.items():
+            self.boards[category] = [self.create_board(moves) for moves in positions]
+
+    @staticmethod
+    def create_board(moves):
+        """
+        :param moves: the columns played from an empty board, red first.
+        :return: the board after the moves.
+        """
+        board = Board()
+        for i, col in enumerate(moves):
+            board.drop(Board.PLAYER_ONE if i % 2 == 0 else Board.PLAYER_TWO, col)
+        return board
+
+    @staticmethod
+    def to_move(board):
+        """
+        :param board: a board from the corpus.
+        :return: the piece of the player whose turn it is.
+        """
+        return Board.PLAYER_ONE if len(board.moves) % 2 == 0 else Board.PLAYER_TWO
+
+    def time_ops(self, func, ops_per_call):
+        """
+        Time a function, calling it until at least min_time has passed, repeat times.
+        :param func: the function to time, which takes no arguments.
+        :param ops_per_call: the number of operations each call does.
+        :return: the best operations per second.
+        """
+        best = 0.0
+        for run in range(0, self.repeat):
+            calls = 0
+            start = time.perf_counter()
+            elapsed = 0.0
+            while elapsed < self.min_time:
+                func()
+                calls += 1
+                elapsed = time.perf_counter() - start
+            best = max(best, calls * ops_per_call / elapsed)
+        return best
+
+    def board_benchmarks(self, boards):
+        """
+        :param boards: the boards to run on.
+        :return: a dictionary of the Board and HeuristicFinder benchmarks, keyed by name.
+        """
+        length = Board.get_length()
+        finders = [HeuristicFinder(Board.OPPONENT[self.to_move(board)], self.to_move(board)) for board in boards]
+
+        def drop():
+            for board in boards:
+                piece = self.to_move(board)
+                for col in range(0, length):
+                    if board.drop(piece, col):
+                        board.undo()
+
+        def can_drop():
+            for board in boards:
+                for col in range(0, length):
+                    board.can_drop(col)
+
+        def legal_moves():
+            for board in boards:
+                board.legal_moves()
+
+        def find_winner():
+            for board in boards:
+                board.find_winner()
+
+        def find_n_in_a_row():
+            for board in boards:
+                for n in Board.TRACKED_RUNS:
+                    board.find_n_in_a_row(Board.PLAYER_ONE, n)
+                    board.find_n_in_a_row(Board.PLAYER_TWO, n)
+
+        def find_disconnected_wins():
+            for board in boards:
+                board.find_disconnected_wins(Board.PLAYER_ONE)
+                board.find_disconnected_wins(Board.PLAYER_TWO)
+
+        def heuristic():
+            for board, finder in zip(boards, finders):
+                finder.heuristic(board)
+
+        drops = sum(1 for board in boards for col in range(0, length) if board.can_drop(col)[0])
+        return {
+            "Board.drop+undo": {"ops_per_sec": self.time_ops(drop, drops)},
+            "Board.can_drop": {"ops_per_sec": self.time_ops(can_drop, len(boards) * length)},
+            "Board.legal_moves": {"ops_per_sec": self.time_ops(legal_moves, len(boards))},
+            "Board.find_winner": {"ops_per_sec": self.time_ops(find_winner, len(boards))},
+            "Board.find_n_in_a_row": {"ops_per_sec": self.time_ops(find_n_in_a_row,
+                                                                   len(boards) * 2 * len(Board.TRACKED_RUNS))},
+            "Board.find_disconnected_wins": {"ops_per_sec": self.time_ops(find_disconnected_wins, len(boards) * 2)},
+            "HeuristicFinder.heuristic": {"ops_per_sec": self.time_ops(heuristic, len(boards))},
+        }
+
+    def search_benchmarks(self, boards, category):
+        """
+        :param boards: the boards to search.
+        :param category: the corpus category of the boards.
+        :return: a dictionary of full MiniMax search benchmarks, one for each search depth, timed
+            from the fastest of repeat runs.
+        """
+        results = {}
+        for depth in self.search_depths:
+            best_elapsed = None
+            nodes = 0
+            for run in range(0, self.repeat):
+                nodes = 0
+                start = time.perf_counter()
+                for board in boards:
+                    piece = self.to_move(board)
+                    minimax = MiniMax(Board.OPPONENT[piece], piece)  # Fresh tables for every search.
+                    minimax.mini_max(BoardNode(board, MiniMax.NEG_INF), MiniMax.NEG_INF, MiniMax.INF, depth)
+                    nodes += minimax.nodes
+                elapsed = time.perf_counter() - start
+                if best_elapsed is None or elapsed < best_elapsed:
+                    best_elapsed = elapsed
+            results["MiniMax.depth_" + str(depth) + "." + category] = {
+                "ops_per_sec": len(boards) / best_elapsed,
+                "nodes_per_sec": nodes / best_elapsed,
+                "nodes": nodes,
+            }
+        return results
+
+    def run(self):
+        """
+        Run every benchmark.
+        :return: a dictionary with 'environment' information and 'results' keyed by benchmark name.
+        """
+        results = {}
+        all_boards = [board for category in sorted(self.boards) for board in self.boards[category]]
+        results.update(self.board_benchmarks(all_boards))
+        for category in sorted(self.boards):
+            results.update(self.search_benchmarks(self.boards[category], category))
+        return {
+            "environment": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                            "machine": platform.machine(), "search_depths": list(self.search_depths)},
+            "results": results,
+        }
+
+    @staticmethod
+    def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+        """
+        Compare results with a baseline.
+        :param current: results from run().
+        :param baseline: results from an earlier run().
+        :param threshold: the slowdown, as a fraction of the baseline, that counts as a regression.
+        :return: a list with a dictionary of name, baseline, current, change and regression for
+            each benchmark in either run, where change is the fractional change in operations per
+            second. For a benchmark only in one run, the other run's value and change are None.
+        """
+        comparison = []
+        for name in sorted(set(current["results"]) | set(baseline["results"])):
+            if name not in baseline["results"] or name not in current["results"]:
+                old = baseline["results"][name]["ops_per_sec"] if name in baseline["results"] else None
+                new = current["results"][name]["ops_per_sec"] if name in current["results"] else None
+                comparison.append({"name": name, "baseline": old, "current": new, "change": None,
+                                   "regression": False})
+                continue
+            old = baseline["results"][name]["ops_per_sec"]
+            new = current["results"][name]["ops_per_sec"]
+            change = (new - old) / old if old else 0.0
+            comparison.append({"name": name, "baseline": old, "current": new, "change": change,
+                               "regression": change < -threshold})
+        return comparison
+
+    @staticmethod
+    def main(argv=None):
+        """
+        Run the suite from the command line. Exits with status 1 if there are regressions.
+        :param argv: the command line arguments, or None for sys.argv.
+        """
+        parser = argparse.ArgumentParser(description="Benchmark the Connect 5 engine.")
+        parser.add_argument("--depths", default=",".join(str(d) for d in BenchmarkSuite.DEFAULT_SEARCH_DEPTHS),
+                            help="comma separated search depths")
+        parser.add_argument("--min-time", type=float, default=BenchmarkSuite.DEFAULT_MIN_TIME,
+                            help="least seconds for each timing run")
+        parser.add_argument("--repeat", type=int, default=BenchmarkSuite.DEFAULT_REPEAT,
+                            help="timing runs for each benchmark")
+        parser.add_argument("--save", help="file to save the results to as JSON")
+        parser.add_argument("--baseline", help="JSON results file to compare with")
+        parser.add_argument("--threshold", type=float, default=BenchmarkSuite.DEFAULT_THRESHOLD,
+                            help="slowdown fraction that counts as a regression")
+        args = parser.parse_args(argv)
+
+        depths = tuple(int(depth) for depth in args.depths.split(",") if depth)
+        current = BenchmarkSuite(depths, args.min_time, args.repeat).run()
+        for name in sorted(current["results"]):
+            result = current["results"][name]
+            line = "{0:<40} {1:>14,.1f} ops/s".format(name, result["ops_per_sec"])
+            if "nodes_per_sec" in result:
+                line += " {0:>12,.0f} nodes/s".format(result["nodes_per_sec"])
+            print(line)
+        if args.save:
+            with open(args.save, "w") as out:
+                json.dump(current, out, indent=2, sort_keys=True)
+
+        if args.baseline:
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = 0
+            print("")
+            for row in BenchmarkSuite.compare(current, baseline, args.threshold):
+                if row["current"] is None:
+                    print("{0:<40} {1:>8} only in the baseline".format(row["name"], ""))
+                    continue
+                if row["baseline"] is None:
+                    print("{0:<40} {1:>8} only in this run".format(row["name"], ""))
+                    continue
+                flag = "REGRESSION" if row["regression"] else ""
+                print("{0:<40} {1:>+8.1%} {2}".format(row["name"], row["change"], flag))
+                if row["regression"]:
+                    regressions += 1
+            if regressions:
+                print(str(regressions) + " regression(s) beyond " + "{0:.0%}".format(args.threshold))
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    BenchmarkSuite.main()
@@ -1,26 +1,199 @@
+from src.zobrist import Zobrist
+from src.windows import WindowTable
+
 __author__ = 'Bill'
 
 
 class Board:
     """
-    Class for the Connect 5 Game Board. The Board is always a 7 long by
-    9 high. A board always remembers the last move made.
+    Class for the Connect 5 Game Board. The Board is 9 long by 7 high with 5 in a row
+    to win, unless another geometry is given with Board(width, height, win_length).
+    A board always remembers the last move made.
+
+    The board is stored as a pair of bitboards, one integer mask per player, and
+    a list of column heights. Each column takes up BOARD_HEIGHT + 1 bits of a mask,
+    starting from the bottom row. The extra bit at the top of every column is never
+    set, which keeps lines from wrapping from one column into the next when a mask
+    is shifted. Every move is kept on a move stack so it can be taken back with undo().
+    The board's Zobrist hash key is updated by every drop and undo, along with the key
+    of its mirror image, where every column is reflected, and so are the run and
+    disconnected win counts the heuristic reads, which only change along the
+    four lines through the cell that was filled or emptied.
+
+    The move stack only holds the column of each move, since the piece and row of any
+    move can be read from the bitboards and heights, so the last move is worked out when
+    it is asked for instead of being built on every drop. Boards use __slots__, so a
+    copy is a handful of fields with no attribute dictionary.
+
+    Everything that depends on the size of the board and the length of a win, the
+    masks, window tables and Zobrist keys, is worked out once per geometry by
+    set_geometry(). Boards of the default geometry are plain Boards, and boards of any
+    other geometry are instances of a subclass of Board made for it by for_geometry(),
+    so the search reads the geometry's constants as class attributes either way.
     """
 
     # Class Constants
     BLANK_SPACE = "_"  # Blank Space
     PLAYER_ONE = "R"  # Red Chip
     PLAYER_TWO = "B"  # Black Chip
-    BOARD_HEIGHT = 7
-    BOARD_LENGTH = 9
-    SCORE_TO_WIN = 5
+    BOARD_HEIGHT = 7  # Default number of rows.
+    BOARD_LENGTH = 9  # Default number of columns.
+    SCORE_TO_WIN = 5  # Default number of pieces in a row that wins.
+    VERTICAL = 1  # Shift between a cell and the cell above it.
+    OPPONENT = {PLAYER_ONE: PLAYER_TWO, PLAYER_TWO: PLAYER_ONE}
+    UNCHECKED = object()  # Marks a winner that has not been looked for since the last move.
+    GEOMETRIES = {}  # Board class for each geometry, keyed by (width, height, win length).
+    # The geometry's bitboard constants and tables, COLUMN_BITS to MIRROR_KEYS, are set by set_geometry().
+
+    __slots__ = ("masks", "heights", "moves", "last_move_winner", "key", "mirror_key", "run_counts",
+                 "disconnected_wins")
+
+    def __new__(cls, width=None, height=None, win_length=None):
+        """
+        Create a board of the right class for its geometry.
+        :param width: the number of columns, or None for the same as cls.
+        :param height: the number of rows, or None for the same as cls.
+        :param win_length: the number of pieces in a row that wins, or None for the same as cls.
+        :return: a new, uninitialized board.
+        """
+        if width is None:
+            width = cls.BOARD_LENGTH
+        if height is None:
+            height = cls.BOARD_HEIGHT
+        if win_length is None:
+            win_length = cls.SCORE_TO_WIN
+        return object.__new__(Board.for_geometry(width, height, win_length))
+
+    def __init__(self, width=None, height=None, win_length=None):
+        """
+        Create a new board. Board() is the default 9 by 7 board with 5 in a row to win.
+        :param width: the number of columns, or None for the default.
+        :param height: the number of rows, or None for the default.
+        :param win_length: the number of pieces in a row that wins, or None for the default.
+        """
+        self.masks = {self.PLAYER_ONE: 0, self.PLAYER_TWO: 0}
+        self.heights = [0] * self.BOARD_LENGTH
+        self.moves = []  # Columns of every move made, oldest first.
+        self.last_move_winner = self.UNCHECKED
+        self.key = 0  # Zobrist hash of the pieces on the board.
+        self.mirror_key = 0  # Zobrist hash of the pieces on the mirrored board.
+        # run_counts[piece][n] is find_n_in_a_row(piece, n) for each n in TRACKED_RUNS.
+        self.run_counts = {self.PLAYER_ONE: [0] * self.SCORE_TO_WIN, self.PLAYER_TWO: [0] * self.SCORE_TO_WIN}
+        # disconnected_wins[piece] is find_disconnected_wins(piece).
+        self.disconnected_wins = {self.PLAYER_ONE: 0, self.PLAYER_TWO: 0}
+
+    def copy(self):
+        """
+        :return: a new board with the same pieces and last move as this one.
+        """
+        board = object.__new__(type(self))
+        board.masks = dict(self.masks)
+        board.heights = list(self.heights)
+        board.moves = list(self.moves)
+        board.last_move_winner = self.last_move_winner
+        board.key = self.key
+        board.mirror_key = self.mirror_key
+        board.run_counts = {self.PLAYER_ONE: list(self.run_counts[self.PLAYER_ONE]),
+                            self.PLAYER_TWO: list(self.run_counts[self.PLAYER_TWO])}
+        board.disconnected_wins = dict(self.disconnected_wins)
+        return board
+
+    def __deepcopy__(self, memo):
+        """
+        Boards only hold integers and strings, so a deep copy is the same as a plain copy.
+        :param memo: the deepcopy memo dictionary.
+        :return: a copy of this board.
+        """
+        return self.copy()
+
+    def __copy__(self):
+        """
+        :return: a copy of this board.
+        """
+        return self.copy()
+
+    def __reduce__(self):
+        """
+        Pickle a board as its geometry and state, since the class made for a geometry other than
+        the default can't be found by name. The winner is looked for first, so the state never
+        holds UNCHECKED, which is a different object after unpickling.
+        :return: Board, the arguments that make an empty board of this geometry, and the state.
+        """
+        self.winner_after_last_move()
+        return Board, self.get_geometry(), (self.masks, self.heights, self.moves, self.last_move_winner, self.key,
+                                            self.mirror_key, self.run_counts, self.disconnected_wins)
+
+    def __setstate__(self, state):
+        """
+        Restore a board pickled by __reduce__.
+        :param state: the state returned by __reduce__.
+        """
+        (self.masks, self.heights, self.moves, self.last_move_winner, self.key, self.mirror_key, self.run_counts,
+         self.disconnected_wins) = state
+
+    @classmethod
+    def set_geometry(cls, width, height, win_length):
+        """
+        Work out the constants and tables for a geometry and set them on a Board class.
+        :param width: the number of columns.
+        :param height: the number of rows.
+        :param win_length: the number of pieces in a row that wins.
+        """
+        cls.BOARD_LENGTH = width
+        cls.BOARD_HEIGHT = height
+        cls.SCORE_TO_WIN = win_length
+        cls.GEOMETRY = (width, height, win_length)
+        cls.CELLS = width * height  # Number of cells on the board.
+        # Columns from the center out, with ties broken left first.
+        cls.CENTER_ORDER = tuple(sorted(range(0, width), key=lambda col: abs(2 * col - (width - 1))))
+
+        # Bitboard Constants
+        cls.COLUMN_BITS = height + 1  # Bits used by each column, including the empty guard bit.
+        cls.HORIZONTAL = cls.COLUMN_BITS  # Shift between a cell and the cell to its right.
+        cls.DIAGONAL_UP = cls.COLUMN_BITS + 1  # Shift between a cell and the cell up and to its right.
+        cls.DIAGONAL_DOWN = cls.COLUMN_BITS - 1  # Shift between a cell and the cell down and to its right.
+        cls.DIRECTIONS = (cls.VERTICAL, cls.HORIZONTAL, cls.DIAGONAL_UP, cls.DIAGONAL_DOWN)
+        # Disconnected wins are not vertical.
+        cls.DISCONNECTED_DIRECTIONS = (cls.HORIZONTAL, cls.DIAGONAL_UP, cls.DIAGONAL_DOWN)
+        cls.TRACKED_RUNS = tuple(range(2, win_length))  # Run lengths counted on every drop.
+        # Pieces in a row a blank cell has to complete to count as a disconnected win.
+        cls.DISCONNECTED_LENGTH = win_length - 1
+        cls.BOTTOM_ROW_MASK = int(("0" * height + "1") * width, 2)  # The lowest bit of every column.
+        cls.BOARD_MASK = cls.BOTTOM_ROW_MASK * ((1 << height) - 1)  # Every playable cell.
+        cls.WIN_WINDOWS = WindowTable.for_geometry(width, height, win_length)
+        cls.RUN_WINDOWS = WindowTable.for_lengths(width, height, cls.TRACKED_RUNS)  # Keyed by run length.
+        cls.DISCONNECTED_WINDOWS = WindowTable.for_geometry(width, height, cls.DISCONNECTED_LENGTH)
+        cls.ZOBRIST = Zobrist(width * cls.COLUMN_BITS, (cls.PLAYER_ONE, cls.PLAYER_TWO))
+        cls.MIRROR_KEYS = cls.ZOBRIST.mirrored(width, cls.COLUMN_BITS)  # Zobrist keys of the mirrored cells.
+
+    @staticmethod
+    def for_geometry(width, height, win_length):
+        """
+        :param width: the number of columns.
+        :param height: the number of rows.
+        :param win_length: the number of pieces in a row that wins.
+        :return: the Board class for the geometry, made on first use.
+        """
+        key = (width, height, win_length)
+        board_class = Board.GEOMETRIES.get(key)
+        if board_class is None:
+            if width < 1 or height < 1:
+                raise ValueError("A board needs at least one row and column, got " + str(key))
+            if not 3 <= win_length <= max(width, height):
+                raise ValueError("Win length must be at least 3 and fit on the board, got " + str(key))
+            board_class = type("Board", (Board,), {"__slots__": (), "__doc__": Board.__doc__})
+            board_class.set_geometry(width, height, win_length)
+            Board.GEOMETRIES[key] = board_class
+        return board_class
 
-    def __init__(self):
+    @classmethod
+    def cell_bit(cls, row, col):
         """
-        Create a new board.
+        :param row: the row number, where row 0 is the top of the board.
+        :param col: the column number.
+        :return: the bitboard bit for the cell at row 'row' and column 'col'.
         """
-        self.grid = self.create_grid()
-        self.last_move = None
+        return 1 << (col * cls.COLUMN_BITS + cls.BOARD_HEIGHT - 1 - row)
 
     def piece_at(self, row, col):
         """
@@ -29,7 +202,12 @@ class Board:
         :param col: specified column
         :return: the value of the piece at row 'row' and column 'col'.
         """
-        return self.grid[col][row]
+        bit = self.cell_bit(row, col)
+        if self.masks[self.PLAYER_ONE] & bit:
+            return self.PLAYER_ONE
+        elif self.masks[self.PLAYER_TWO] & bit:
+            return self.PLAYER_TWO
+        return self.BLANK_SPACE
 
     def can_drop(self, col_num):
         """
@@ -37,14 +215,33 @@ class Board:
         :return: An array containing a boolean and an integer. The boolean is used to determine
             if a piece can be dropped and the integer is used to tell which row the piece will be dropped into.
         """
-        blank_found = False
-        row_num = self.BOARD_HEIGHT - 1
-        while not blank_found and row_num >= 0:
-            if self.grid[col_num][row_num] is not self.BLANK_SPACE:
-                row_num -= 1
-            else:
-                blank_found = True
-        return [blank_found, row_num]
+        height = self.heights[col_num]
+        return [height < self.BOARD_HEIGHT, self.BOARD_HEIGHT - 1 - height]
+
+    def is_legal(self, col_num):
+        """
+        :param col_num: the column number.
+        :return: true if a piece can be dropped into the column.
+        """
+        return self.heights[col_num] < self.BOARD_HEIGHT
+
+    def drop_row(self, col_num):
+        """
+        :param col_num: the column number, which must not be full.
+        :return: the row a piece dropped into the column lands in.
+        """
+        return self.BOARD_HEIGHT - 1 - self.heights[col_num]
+
+    def legal_moves(self, order=None):
+        """
+        :param order: the columns to consider, in the order to return them, or None for every
+            column from left to right.
+        :return: a list of the columns in order that a piece can be dropped into.
+        """
+        heights = self.heights
+        if order is None:
+            order = range(0, self.BOARD_LENGTH)
+        return [col_num for col_num in order if heights[col_num] < self.BOARD_HEIGHT]
 
     def drop(self, dropped_char, col_num):
         """
@@ -53,27 +250,164 @@ class Board:
         :param col_num: the column to drop the piece into.
         :return: true if the drop was successful or false if the column is full.
         """
-        drop = self.can_drop(col_num)
-        can_drop = drop[0]
-        row_num = drop[1]
-        if can_drop:
-            self.grid[col_num][row_num] = dropped_char
-            self.last_move = [dropped_char, col_num, row_num]
+        height = self.heights[col_num]
+        if height < self.BOARD_HEIGHT:
+            cell = col_num * self.COLUMN_BITS + height
+            self.update_counts(cell, dropped_char, 1)
+            self.masks[dropped_char] |= 1 << cell
+            self.key ^= self.ZOBRIST.keys[dropped_char][cell]
+            self.mirror_key ^= self.MIRROR_KEYS[dropped_char][cell]
+            self.heights[col_num] = height + 1
+            self.moves.append(col_num)
+            self.last_move_winner = self.UNCHECKED
+            return True
+        return False
+
+    def undo(self):
+        """
+        Take back the last move made on this board.
+        :return: the column the piece was removed from, or None if no moves have been made.
+        """
+        if not self.moves:
+            return None
+        col_num = self.moves.pop()
+        height = self.heights[col_num] - 1
+        cell = col_num * self.COLUMN_BITS + height
+        bit = 1 << cell
+        self.heights[col_num] = height
+        piece = self.PLAYER_ONE if self.masks[self.PLAYER_ONE] & bit else self.PLAYER_TWO
+        self.masks[piece] ^= bit
+        self.update_counts(cell, piece, -1)
+        self.key ^= self.ZOBRIST.keys[piece][cell]
+        self.mirror_key ^= self.MIRROR_KEYS[piece][cell]
+        self.last_move_winner = self.UNCHECKED
+        return col_num
+
+    def update_counts(self, cell, piece, sign):
+        """
+        Update the run and disconnected win counts for a piece being dropped into or removed
+        from a cell. Only the lines through the cell are looked at. The cell must be empty in
+        the bitboards when this is called, so a drop and its undo see the same board and
+        make opposite changes.
+        :param cell: the bitboard bit index of the cell.
+        :param piece: the value of the piece.
+        :param sign: 1 if the piece is being dropped, -1 if it is being removed.
+        """
+        pieces = self.masks[piece]
+        opponent = self.OPPONENT[piece]
+        opponent_pieces = self.masks[opponent]
+        empty = self.BOARD_MASK & ~(pieces | opponent_pieces)
+        needed = self.DISCONNECTED_LENGTH - 1  # Pieces around a blank cell that make it a disconnected win.
+        bit = 1 << cell
+        runs = self.run_counts[piece]
+        disconnected = 0
+        opponent_disconnected = 0
+        # New runs of n that go through the cell.
+        with_cell = pieces | bit
+        for n in self.TRACKED_RUNS:
+            count = 0
+            for shift, mask in self.RUN_WINDOWS[n].cell_windows[cell]:
+                if with_cell & mask == mask:
+                    count += 1
+            runs[n] += sign * count
+
+        for shift in self.DISCONNECTED_DIRECTIONS:
+            # The piece's runs on either side of the cell, and the cells just past them.
+            before = 0
+            before_end = bit >> shift
+            while pieces & before_end:
+                before += 1
+                before_end >>= shift
+            after = 0
+            after_end = bit << shift
+            while pieces & after_end:
+                after += 1
+                after_end <<= shift
+
+            # The cell stops being a disconnected win for either player.
+            if before + after >= needed:
+                disconnected -= 1
+            opponent_connection = 0
+            curr = bit >> shift
+            while opponent_pieces & curr:
+                opponent_connection += 1
+                curr >>= shift
+            curr = bit << shift
+            while opponent_pieces & curr:
+                opponent_connection += 1
+                curr <<= shift
+            if opponent_connection >= needed:
+                opponent_disconnected -= 1
+
+            # The empty cells at either end of the piece's run now touch a longer run.
+            if empty & before_end:
+                beyond = 0
+                curr = before_end >> shift
+                while pieces & curr:
+                    beyond += 1
+                    curr >>= shift
+                if before + 1 + after + beyond >= needed > before + beyond:
+                    disconnected += 1
+            if empty & after_end:
+                beyond = 0
+                curr = after_end << shift
+                while pieces & curr:
+                    beyond += 1
+                    curr <<= shift
+                if after + 1 + before + beyond >= needed > after + beyond:
+                    disconnected += 1
+        self.disconnected_wins[piece] += sign * disconnected
+        self.disconnected_wins[opponent] += sign * opponent_disconnected
+
+    def get_run_count(self, piece, n):
+        """
+        The same as find_n_in_a_row(piece, n), but read from the counts kept up to date by
+        drop and undo instead of scanning the board.
+        :param piece: a player piece.
+        :param n: a run length in TRACKED_RUNS.
+        :return: the number of n in_a_row for the specific piece on this board.
+        """
+        return self.run_counts[piece][n]
+
+    def get_disconnected_wins(self, piece):
+        """
+        The same as find_disconnected_wins(piece), but read from the count kept up to date by
+        drop and undo instead of scanning the board.
+        :param piece: a player piece.
+        :return: the number of unconnected wins.
+        """
+        return self.disconnected_wins[piece]
 
     def is_filled(self):
         """
         :return: true if there are no blank spaces on the board.
         """
-        blank_found = False
-        for i in range(0, self.BOARD_HEIGHT):
-            if blank_found:
-                break
-            for j in range(0, self.BOARD_LENGTH):
-                if blank_found:
-                    break
-                if self.grid[j][i] == self.BLANK_SPACE:
-                    blank_found = True
-        return not blank_found
+        return self.masks[self.PLAYER_ONE] | self.masks[self.PLAYER_TWO] == self.BOARD_MASK
+
+    def mask_of(self, piece):
+        """
+        :param piece: a player piece or the blank space.
+        :return: the bitboard of every cell holding the given piece.
+        """
+        if piece == self.BLANK_SPACE:
+            return self.BOARD_MASK & ~(self.masks[self.PLAYER_ONE] | self.masks[self.PLAYER_TWO])
+        return self.masks.get(piece, 0)
+
+    @staticmethod
+    def popcount(mask):
+        """
+        :param mask: a bitboard.
+        :return: the number of set bits in the bitboard.
+        """
+        return bin(mask).count("1")
+
+    @classmethod
+    def window_table(cls, n):
+        """
+        :param n: the number of cells in each window.
+        :return: the WindowTable of every n cell line on this board.
+        """
+        return WindowTable.for_geometry(cls.BOARD_LENGTH, cls.BOARD_HEIGHT, n)
 
     def find_n_in_a_row(self, piece, n):
         """
@@ -83,15 +417,24 @@ class Board:
         :param n: Look for n in_a_row
         :return: the number of n in_a_row for the specific piece on this board.
         """
-        count = 0
-        for row in range(0, Board.get_height()):
-            for col in range(0, Board.get_length()):
-                current_piece = self.grid[col][row]
-                if current_piece == piece:
-                    count += self.num_n_in_a_row_horizontal(row, col, current_piece, n)  # 0 or 1
-                    count += self.num_n_in_a_row_vertical(row, col, current_piece, n)  # 0 or 1
-                    count += self.num_n_in_a_row_diagonal(row, col, current_piece, n)  # 0, 1,  or 2
-        return count
+        return self.window_table(n).count_filled(self.mask_of(piece))
+
+    def has_window(self, piece, start_row, start_col, shift, n):
+        """
+        :param piece: the value of the piece.
+        :param start_row: the row of the window's lowest bit.
+        :param start_col: the column of the window's lowest bit.
+        :param shift: the direction of the window.
+        :param n: the number of cells in the window.
+        :return: 1 if the window is on the board and filled by the piece, otherwise 0.
+        """
+        if not 0 <= start_row < self.BOARD_HEIGHT or not 0 <= start_col < self.BOARD_LENGTH:
+            return 0
+        cell = start_col * self.COLUMN_BITS + self.BOARD_HEIGHT - 1 - start_row
+        mask = self.window_table(n).starting_at.get((cell, shift))
+        if mask is not None and self.mask_of(piece) & mask == mask:
+            return 1
+        return 0
 
     def num_n_in_a_row_horizontal(self, row, col, piece, n):
         """
@@ -103,18 +446,7 @@ class Board:
         :param n: Look for n_in_a_row
         :return: the number of times this piece satisfies the n_in_a_row condition horizontally. (Either 0 or 1)
         """
-        streak = 0
-        for curr_col in range(col, col + n):  # count the initial piece automatically
-            if curr_col > Board.get_length() - 1:  # check out of bounds
-                break
-            if self.grid[curr_col][row] != piece:
-                return 0
-            else:
-                streak += 1
-        if streak == n:
-            return 1
-        else:
-            return 0
+        return self.has_window(piece, row, col, self.HORIZONTAL, n)
 
     def num_n_in_a_row_vertical(self, row, col, piece, n):
         """
@@ -126,18 +458,7 @@ class Board:
         :param n: Look for n_in_a_row
         :return: the number of times this piece satisfies the n_in_a_row condition vertically. (Either 0 or 1)
         """
-        streak = 0
-        for curr_row in range(row - n + 1, row + 1):  # count the initial piece automatically
-            if curr_row < 0:  # check out of bounds
-                break
-            if self.grid[col][curr_row] != piece:
-                return 0
-            else:
-                streak += 1
-        if streak == n:
-            return 1
-        else:
-            return 0
+        return self.has_window(piece, row, col, self.VERTICAL, n)
 
     def num_n_in_a_row_diagonal(self, row, col, piece, n):
         """
@@ -149,49 +470,60 @@ class Board:
         :param n: Look for n_in_a_row
         :return: the number of times this piece satisfies the n_in_a_row condition diagonally. (Either 0, 1, or 2)
         """
-        result = 0
-        streak = 0
-        for modifier in range(0, n):  # count the initial piece automatically
-            curr_col = col + modifier
-            curr_row = row - modifier
-            if curr_col > Board.get_length() - 1 or curr_row < 0:  # check out of bounds
-                break
-            if self.grid[curr_col][curr_row] != piece:
-                break
-            else:
-                streak += 1
-        if streak == n:
-            result += 1
-
-        streak = 0  # reset streak
-
-        for modifier in range(0, n):  # count the initial piece automatically
-            curr_col = col - modifier
-            curr_row = row - modifier
-            if curr_col < 0 or curr_row < 0:  # check out of bounds
-                break
-            if self.grid[curr_col][curr_row] != piece:
-                break
-            else:
-                streak += 1
-        if streak == n:
-            result += 1
-
-        return result
+        # Up and to the right, then up and to the left, which is the window going down and to
+        # the right from its other end.
+        return (self.has_window(piece, row, col, self.DIAGONAL_UP, n) +
+                self.has_window(piece, row - n + 1, col - n + 1, self.DIAGONAL_DOWN, n))
 
     def find_winner(self):
         """
         Check if the current board has a winner. A winner has 5 in a row horizontally, vertically, or diagonally.
         :return: a character representing a player, or None if there is no winner.
         """
-        win_amount = self.SCORE_TO_WIN
-        if self.find_n_in_a_row(Board.PLAYER_ONE, win_amount) >= 1:
+        if self.WIN_WINDOWS.any_filled(self.masks[Board.PLAYER_ONE]):
             return Board.PLAYER_ONE
-        elif self.find_n_in_a_row(Board.PLAYER_TWO, win_amount) >= 1:
+        elif self.WIN_WINDOWS.any_filled(self.masks[Board.PLAYER_TWO]):
             return Board.PLAYER_TWO
         else:
             return None
 
+    def winner_after_last_move(self):
+        """
+        Check if the last move made on this board won the game. Only the windows through the
+        last move are looked at, and the answer is remembered until the next drop or undo.
+        Assumes the game was not already won before the last move, like the game and search do.
+        :return: the piece of the player who made the last move if it won, otherwise None.
+        """
+        if self.last_move_winner is self.UNCHECKED:
+            self.last_move_winner = None
+            if self.moves:
+                col_num = self.moves[-1]
+                cell = col_num * self.COLUMN_BITS + self.heights[col_num] - 1
+                piece = self.PLAYER_ONE if self.masks[self.PLAYER_ONE] >> cell & 1 else self.PLAYER_TWO
+                pieces = self.masks[piece]
+                for shift, mask in self.WIN_WINDOWS.cell_windows[cell]:
+                    if pieces & mask == mask:
+                        self.last_move_winner = piece
+                        break
+        return self.last_move_winner
+
+    def disconnected_wins_at(self, pieces, cell, directions):
+        """
+        :param pieces: a player's bitboard.
+        :param cell: the bitboard bit index of a cell.
+        :param directions: the shifts of the directions to look in.
+        :return: the number of the given directions where filling the cell gives the player
+            DISCONNECTED_LENGTH pieces in a row.
+        """
+        bit = 1 << cell
+        result = 0
+        for shift in directions:
+            for window_shift, mask in self.DISCONNECTED_WINDOWS.cell_windows[cell]:
+                if window_shift == shift and (pieces | bit) & mask == mask:
+                    result += 1
+                    break
+        return result
+
     def find_disconnected_wins(self, piece):
         """
         Find blank areas that, when filled in with the given type of piece, cause a victory
@@ -199,13 +531,16 @@ class Board:
         :param piece: the player piece
         :return: the number of unconnected wins.
         """
+        pieces = self.mask_of(piece)
+        blanks = self.mask_of(self.BLANK_SPACE)
         count = 0
-        for row in range(0, Board.get_height()):
-            for col in range(0, Board.get_length()):
-                current_piece = self.grid[col][row]
-                if current_piece == Board.BLANK_SPACE:
-                    count += self.find_horizontal_disconnected_wins(piece, col, row)
-                    count += self.find_disconnected_diagonal_wins(piece, col, row)
+        for shift in self.DISCONNECTED_DIRECTIONS:
+            fills = 0  # Each blank cell counts once per direction.
+            for mask in self.DISCONNECTED_WINDOWS.by_direction[shift]:
+                missing = mask & ~pieces
+                if missing & blanks and missing & (missing - 1) == 0:  # A single blank cell.
+                    fills |= missing
+            count += self.popcount(fills)
         return count
 
     def find_horizontal_disconnected_wins(self, piece, col_num, row_num):
@@ -215,25 +550,8 @@ class Board:
         :param row_num: the row number of the last move made.
         :return: 1 if the filled in blank piece causes a horizontal victory for its corresponding player.
         """
-        connection = 1
-        curr_col = col_num - 1
-        while curr_col >= 0:
-            if self.grid[curr_col][row_num] == piece:
-                connection += 1
-                curr_col -= 1
-            else:  # can't possibly have a longer connection this way.
-                break
-
-        curr_col = col_num + 1
-        while curr_col < self.BOARD_LENGTH:
-            if self.grid[curr_col][row_num] == piece:
-                connection += 1
-                curr_col += 1
-            else:  # can't possibly have a longer connection this way.
-                break
-        if connection >= 4:
-            return 1
-        return 0
+        cell = col_num * self.COLUMN_BITS + self.BOARD_HEIGHT - 1 - row_num
+        return self.disconnected_wins_at(self.mask_of(piece), cell, (self.HORIZONTAL,))
 
     def find_disconnected_diagonal_wins(self, piece, col_num, row_num):
         """
@@ -242,73 +560,106 @@ class Board:
         :param row_num: the row number of the last move made.
         :return: 1 if the filled in blank piece causes a diagonal victory for its corresponding player.
         """
-        result = 0
-        connection = 1
-        # Upper Left to Lower Right Diagonal
-        curr_row = row_num - 1
-        curr_col = col_num - 1
-        while curr_row >= 0 and curr_col >= 0:
-            if self.grid[curr_col][curr_row] == piece:
-                connection += 1
-                curr_col -= 1
-                curr_row -= 1
-            else:  # can't possibly have a longer connection this way.
-                break
-
-        curr_row = row_num + 1
-        curr_col = col_num + 1
-
-        while curr_row < self.BOARD_HEIGHT and curr_col < self.BOARD_LENGTH:
-            if self.grid[curr_col][curr_row] == piece:
-                connection += 1
-                curr_col += 1
-                curr_row += 1
-            else:  # can't possibly have a longer connection this way.
-                break
-
-        if connection >= 4:
-            result += 1
-
-        # Lower Left to Upper Right Diagonal
-        connection = 1
-        curr_row = row_num - 1
-        curr_col = col_num + 1
-        while curr_row >= 0 and curr_col < self.BOARD_LENGTH:
-            if self.grid[curr_col][curr_row] == piece:
-                connection += 1
-                curr_row -= 1
-                curr_col += 1
-            else:  # can't possibly have a longer connection this way.
-                break
-
-        curr_row = row_num + 1
-        curr_col = col_num - 1
-        while curr_row < self.BOARD_HEIGHT and curr_col >= 0:
-            if self.grid[curr_col][curr_row] == piece:
-                connection += 1
-                curr_row += 1
-                curr_col -= 1
-            else:  # can't possibly have a longer connection this way.
-                break
-        if connection >= 4:
-            result += 1
-        return result
+        cell = col_num * self.COLUMN_BITS + self.BOARD_HEIGHT - 1 - row_num
+        return self.disconnected_wins_at(self.mask_of(piece), cell, (self.DIAGONAL_UP, self.DIAGONAL_DOWN))
+
+    def winning_cells(self, piece):
+        """
+        Find every blank cell that would give the player SCORE_TO_WIN in a row, in any direction,
+        whether or not a piece can be dropped into it yet. Each direction is checked for the whole
+        board at once by shifting the player's bitboard along it.
+        :param piece: the player piece
+        :return: the bitboard of the winning cells.
+        """
+        pieces = self.masks[piece]
+        cells = 0
+        for shift in self.DIRECTIONS:
+            for gap in range(0, self.SCORE_TO_WIN):
+                # Cells with the player's pieces 'gap' cells back and the rest of the line ahead.
+                line = self.BOARD_MASK
+                for i in range(-gap, self.SCORE_TO_WIN - gap):
+                    if i > 0:
+                        line &= pieces >> (i * shift)
+                    elif i < 0:
+                        line &= pieces << (-i * shift)
+                cells |= line
+        return cells & self.mask_of(self.BLANK_SPACE)
 
-    def create_grid(self):
+    def playable_cells(self):
         """
-        :return: a 2-dimensional array representing the game grid.
+        :return: the bitboard of the cells a piece would land in, one for each column that is not full.
         """
-        grid = []
-        for i in range(0, self.BOARD_LENGTH):
-            grid.append(self.create_empty_column())
-        return grid
+        return ((self.masks[self.PLAYER_ONE] | self.masks[self.PLAYER_TWO]) + self.BOTTOM_ROW_MASK) & self.BOARD_MASK
+
+    @classmethod
+    def cell_columns(cls, mask):
+        """
+        :param mask: a bitboard.
+        :return: a list of the column of every cell in the bitboard, from left to right.
+        """
+        columns = []
+        while mask:
+            bit = mask & -mask
+            columns.append((bit.bit_length() - 1) // cls.COLUMN_BITS)
+            mask ^= bit
+        return columns
+
+    def get_key(self):
+        """
+        :return: the Zobrist hash key of this board's position.
+        """
+        return self.key
+
+    def get_mirror_key(self):
+        """
+        :return: the Zobrist hash key of this board's mirror image.
+        """
+        return self.mirror_key
+
+    def get_canonical_key(self):
+        """
+        :return: the smaller of the board's key and its mirror image's key, which is the same for
+            a position and its mirror image.
+        """
+        return self.mirror_key if self.mirror_key < self.key else self.key
+
+    def is_mirrored(self):
+        """
+        :return: true if the canonical key is the mirror image's key, so columns found for the
+            canonical key have to be reflected with mirror_col to be played on this board.
+        """
+        return self.mirror_key < self.key
+
+    @classmethod
+    def mirror_col(cls, col_num):
+        """
+        :param col_num: the column number.
+        :return: the column in the same place counting from the other side.
+        """
+        return cls.BOARD_LENGTH - 1 - col_num
+
+    def get_moves(self):
+        """
+        :return: a list of (piece, column) pairs for every move made on this board, oldest first.
+        """
+        heights = [0] * self.BOARD_LENGTH
+        moves = []
+        for col_num in self.moves:
+            bit = 1 << (col_num * self.COLUMN_BITS + heights[col_num])
+            heights[col_num] += 1
+            moves.append((self.PLAYER_ONE if self.masks[self.PLAYER_ONE] & bit else self.PLAYER_TWO, col_num))
+        return moves
 
     def get_last_move(self):
         """
         :return: An array containing information about the last move, including the value
-         of the piece, the column, and the row.
+         of the piece, the column, and the row, or None if no moves have been made.
         """
-        return self.last_move
+        if not self.moves:
+            return None
+        col_num = self.moves[-1]
+        row_num = self.BOARD_HEIGHT - self.heights[col_num]
+        return [self.piece_at(row_num, col_num), col_num, row_num]
 
     def __str__(self):
         """
@@ -317,29 +668,38 @@ class Board:
         board_string = ""
         for i in range(0, self.BOARD_HEIGHT):
             for j in range(0, self.BOARD_LENGTH):
-                board_string += " " + self.grid[j][i] + " "
+                board_string += " " + self.piece_at(i, j) + " "
             board_string += "\n"
         return board_string
 
-    def create_empty_column(self):
+    @classmethod
+    def get_length(cls):
         """
-        :return: an array representing an empty column on the board.
+        :return: the length of this board.
         """
-        column = []
-        for i in range(0, self.BOARD_HEIGHT):
-            column.append(self.BLANK_SPACE)
-        return column
+        return cls.BOARD_LENGTH
 
-    @staticmethod
-    def get_length():
+    @classmethod
+    def get_height(cls):
         """
-        :return: the length of this board.
+        :return: the height of this board.
         """
-        return Board.BOARD_LENGTH
+        return cls.BOARD_HEIGHT
 
-    @staticmethod
-    def get_height():
+    @classmethod
+    def get_win_length(cls):
         """
-        :return: the height of this board.
+        :return: the number of pieces in a row that wins on this board.
+        """
+        return cls.SCORE_TO_WIN
+
+    @classmethod
+    def get_geometry(cls):
+        """
+        :return: the board's (width, height, win length).
         """
-        return Board.BOARD_HEIGHT
+        return cls.GEOMETRY
+
+
+Board.set_geometry(Board.BOARD_LENGTH, Board.BOARD_HEIGHT, Board.SCORE_TO_WIN)
+Board.GEOMETRIES[Board.GEOMETRY] = Board
@@ -4,17 +4,22 @@ __author__ = 'Bill'
 class BoardNode:
     """
     Nodes used in the Minimax algorithm. Each node contains a board, a heuristic value,
-    and zero or more children.
+    and optionally the node it was reached from. Nodes use __slots__, so they have no
+    attribute dictionary.
     """
 
-    def __init__(self, board, heuristic):
+    __slots__ = ("board", "heuristic", "parent")
+
+    def __init__(self, board, heuristic, parent=None):
         """
         Create a BoardNode for the minimax algorithm
         :param board: this node's board.
         :param heuristic: this node's heuristic value
+        :param parent: the node this node's board was reached from, or None.
         """
         self.board = board
         self.heuristic = heuristic
+        self.parent = parent
 
     def get_board(self):
         """
@@ -22,6 +27,12 @@ class BoardNode:
         """
         return self.board
 
+    def get_parent(self):
+        """
+        :return: the node this node's board was reached from, or None.
+        """
+        return self.parent
+
     def get_heuristic(self):
         """
         :return: this node's heuristic
@@ -0,0 +1,188 @@
+from src.board import Board
+from src.search_timeout import SearchTimeout
+import time
+
+__author__ = 'Bill'
+
+
+class EndgameSolver:
+    """
+    Solves Connect 5 positions exactly, for when few enough cells are left that the
+    whole game tree can be searched. Positions are scored for the player to move: a
+    win scores the number of cells still blank after the winning piece plus one, a
+    loss scores minus that, and a draw scores 0. Faster wins score higher, so the
+    score also gives the distance to the end of the game.
+
+    The exact score is found by a series of null-window searches, each of which only
+    asks whether the score is above a guess, narrowing the range of possible scores
+    until it holds one value. Bounds found by every search are kept in a win/loss/draw
+    table, keyed by canonical key and player to move, so each search reuses the last.
+    """
+
+    # Class Constants
+    MAX_TABLE_SIZE = 1 << 20  # Entries kept in the table before it is cleared.
+    TIME_CHECK_INTERVAL = 256  # Nodes searched between clock checks, must be a power of two.
+
+    def __init__(self):
+        """
+        Create a solver with an empty table.
+        """
+        self.table = {}  # (lower bound, upper bound) of each solved score, keyed by position.
+        self.nodes = 0  # Nodes searched since the solve started.
+        self.deadline = None  # Time the solve has to stop by, or None for no limit.
+        self.stop_requested = False  # Set by cancel() to stop a running solve.
+
+    @staticmethod
+    def empty_cells(board):
+        """
+        :param board: the board.
+        :return: the number of blank cells on the board.
+        """
+        return board.CELLS - len(board.moves)
+
+    @staticmethod
+    def distance(board, score):
+        """
+        :param board: the board the score was found for.
+        :param score: a score from solve().
+        :return: the number of moves, counting both players, until the game is won or lost, or
+            None for a draw.
+        """
+        if score == 0:
+            return None
+        return EndgameSolver.empty_cells(board) - abs(score) + 1
+
+    def cancel(self):
+        """
+        Stop a running solve from another thread, which then raises SearchTimeout.
+        """
+        self.stop_requested = True
+
+    def reset_cancel(self):
+        """
+        Clear an earlier cancel(), so the next solve runs.
+        """
+        self.stop_requested = False
+
+    def solve(self, board, piece, deadline=None):
+        """
+        Find the exact score of a position and the best move. The board's last move must not
+        have won the game.
+        :param board: the board, which is restored before returning.
+        :param piece: the piece of the player to move.
+        :param deadline: the time.perf_counter() value to stop by, or None for no limit. When it
+            passes, or the solve is cancelled, SearchTimeout is raised.
+        :return: the best column, or None if the board is filled, and the score.
+        """
+        self.nodes = 0
+        self.deadline = deadline
+        if len(self.table) > self.MAX_TABLE_SIZE:
+            self.table.clear()
+        empty = self.empty_cells(board)
+        playable = board.playable_cells()
+        if not playable:
+            return None, 0
+        wins = board.winning_cells(piece) & playable
+        if wins:
+            return board.cell_columns(wins)[0], empty
+
+        # Narrow the range of possible scores with null-window searches until it holds one value.
+        low = -empty
+        high = empty
+        while low < high:
+            guess = low + (high - low) // 2
+            if guess <= 0 and -(-low // 2) < guess:  # Try losses and wins before the middle of the range.
+                guess = -(-low // 2)
+            elif guess >= 0 and high // 2 > guess:
+                guess = high // 2
+            score = self.negamax(board, piece, guess, guess + 1)
+            if score <= guess:
+                high = score
+            else:
+                low = score
+        score = low
+
+        # The best move is the first one that keeps the score, trying columns from the center out.
+        opponent = Board.OPPONENT[piece]
+        for col in board.CENTER_ORDER:
+            if board.drop(piece, col):
+                reply = self.negamax(board, opponent, -score, -score + 1)
+                board.undo()
+                if -reply >= score:
+                    return col, score
+        return None, score  # Not reached, some move always keeps the score.
+
+    def negamax(self, board, piece, alpha, beta):
+        """
+        Alpha-beta search to the end of the game, for the player to move.
+        :param board: the board, which is restored before returning. Its last move must not have
+            won the game.
+        :param piece: the piece of the player to move.
+        :param alpha: the alpha value
+        :param beta: the beta value
+        :return: the score if it is between alpha and beta, otherwise a bound on the score
+            beyond alpha or beta.
+        """
+        self.nodes += 1
+        if not self.nodes & (self.TIME_CHECK_INTERVAL - 1):
+            if self.stop_requested or (self.deadline is not None and time.perf_counter() > self.deadline):
+                raise SearchTimeout()
+        empty = board.CELLS - len(board.moves)
+        playable = board.playable_cells()
+        if not playable:  # Filled without a winner.
+            return 0
+        if board.winning_cells(piece) & playable:
+            return empty
+        opponent = Board.OPPONENT[piece]
+        opponent_wins = board.winning_cells(opponent)
+        possible = playable
+        forced = playable & opponent_wins
+        if forced:
+            if forced & (forced - 1):  # Two wins for the opponent cannot both be blocked.
+                return -(empty - 1)
+            possible = forced
+        possible &= ~(opponent_wins >> Board.VERTICAL)  # Never play under one of the opponent's wins.
+        if not possible:
+            return -(empty - 1)
+
+        # Without a win now, the best is a win with the move after next, or a draw, and the
+        # opponent cannot win sooner than their next move.
+        upper = max(empty - 2, 0)
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+        key = board.get_canonical_key() ^ board.ZOBRIST.to_move[piece]
+        bounds = self.table.get(key)
+        if bounds is not None:
+            lower, upper = bounds
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha = max(alpha, lower)
+            beta = min(beta, upper)
+        else:
+            lower = -(empty - 1)
+
+        original_alpha = alpha
+        best = -(empty - 1)
+        column_bits = board.COLUMN_BITS
+        for col in board.CENTER_ORDER:
+            if not possible & (((1 << column_bits) - 1) << (col * column_bits)):
+                continue
+            board.drop(piece, col)
+            score = -self.negamax(board, opponent, -beta, -alpha)
+            board.undo()
+            if score > best:
+                best = score
+                if score >= beta:
+                    self.table[key] = (max(lower, score), upper)
+                    return score
+                if score > alpha:
+                    alpha = score
+        if best <= original_alpha:
+            self.table[key] = (lower, min(upper, best))
+        else:
+            self.table[key] = (best, best)
+        return best
@@ -1,6 +1,18 @@
+from src.assets import Assets
+from src.board import Board
+from src.game_record import GameRecord, GameRecordWriter
+from src.minimax import MiniMax
+from src.opening_book import OpeningBook
+from src.parallel_search import ParallelMiniMax
+from src.search_result import SearchResult
+from src.search_timeout import SearchTimeout
+import argparse
 import pygame
+import queue
 import random
-from src.minimax import *
+import sys
+import threading
+import traceback
 
 __author__ = 'Bill Ezekiel'
 
@@ -13,44 +25,65 @@ class Game:
     into columns, similar to the actual Connect 4 game. The Board is the current game board.
     The message box displays messages about the game, notifying the player when to go, when the
     game has ended, who has won, and several other messages.
-    """
 
-    # Initialize pygame components
-    pygame.mixer.pre_init(44100, 16, 2, 4096)
-    pygame.init()
+    Given a game record file, the game is added to it as it is played, with the search
+    stats of the AI's moves. A file made for another board or format is left alone and
+    the game is not recorded.
+
+    The AI normally searches with MiniMax's iterative deepening on a background thread.
+    Given a number of workers, it instead searches to AI_PARALLEL_DEPTH with
+    ParallelMiniMax, spread over that many processes.
+
+    pygame is only set up when a Game is created, and images and sounds are loaded the
+    first time they are drawn or played, so importing this module does no work.
+
+    After the first frame, only what changes is drawn again: the cell a piece was dropped
+    into, the chip above the column under the mouse, and the message box when its text
+    changes. The areas drawn are collected as dirty rectangles, and each frame only those
+    are copied to the window with pygame.display.update. Frames with nothing to draw
+    copy nothing.
+    """
 
     # Player Constants
     PLAYER_MOVE_FIRST = "R"  # Red always moves first.
     PLAYER_MOVE_LAST = "B"
 
-    # Image Files
-    RED_CHIP = pygame.image.load("../img/red_chip.png")
-    BLACK_CHIP = pygame.image.load("../img/black_chip.png")
-    BLANK_SPACE = pygame.image.load("../img/blank_space.png")
-    RED_SPACE = pygame.image.load("../img/red_space.png")
-    BLACK_SPACE = pygame.image.load("../img/black_space.png")
-    MOUSE_AREA_BACKGROUND = pygame.image.load("../img/mouse_area_bg.png")
-    MSG_BOX = pygame.image.load("../img/msg_box_box.png")
-    MSG_BOX_BACKGROUND = pygame.image.load("../img/msg_box_bg.png")
-    BOARD_BACKGROUND = pygame.image.load("../img/board_bg.png")
-    BOARD_BACKGROUND_OVERLAY = pygame.image.load("../img/board_bg_overlay.png")
+    # AI Constants
+    AI_TIME_BUDGET_MS = 1000  # Time the AI may spend on a move.
+    AI_MAX_DEPTH = 8  # Deepest the AI will search.
+    AI_PARALLEL_DEPTH = 6  # Depth of the AI's search when it runs on worker processes.
+    FRAME_RATE = 30  # Most frames drawn per second, including while the AI is thinking.
+
+    # Image Files, loaded by Assets on first use.
+    RED_CHIP = "red_chip.png"
+    BLACK_CHIP = "black_chip.png"
+    BLANK_SPACE = "blank_space.png"
+    RED_SPACE = "red_space.png"
+    BLACK_SPACE = "black_space.png"
+    MOUSE_AREA_BACKGROUND = "mouse_area_bg.png"
+    MSG_BOX = "msg_box_box.png"
+    MSG_BOX_BACKGROUND = "msg_box_bg.png"
+    BOARD_BACKGROUND = "board_bg.png"
+    BOARD_BACKGROUND_OVERLAY = "board_bg_overlay.png"
     IMG_LENGTH = 50  # All images are squares so this applies to height as well.
 
-    # Sound Effects
-    DROP_SOUND = pygame.mixer.Sound("../sfx/drop.wav")
-    WIN_SOUND = pygame.mixer.Sound("../sfx/win.wav")
-    LOSE_SOUND = pygame.mixer.Sound("../sfx/lose.wav")
+    # Sound Effects, loaded by Assets on first use.
+    DROP_SOUND = "drop.wav"
+    WIN_SOUND = "win.wav"
+    LOSE_SOUND = "lose.wav"
 
     # Message Box Texts
     MSG_WELCOME = "Welcome to Connect 5!"
     MSG_YOUR_TURN = "Your Turn!"
     MSG_AI_TURN = "Waiting for Opponent..."
+    MSG_AI_THINKING = "Thinking... depth {0}, {1} nodes"
     MSG_YOU_WIN = "You Win!"
     MSG_AI_WIN = "Computer Wins!"
     MSG_TIE = "Tie!"
     MSG_GAME_OVER = "Game Over."
     MSG_PLAY_AGAIN = "Play again?"
     MSG_INVALID_DROP = "You can't drop a piece there!"
+    MSG_AI_FAILED = "AI failed, moved at random."
 
     # Size of window and its components (in pixels).
     # Window Dimensions = 450px x 540px
@@ -63,23 +96,84 @@ class Game:
     WINDOW_LENGTH = Board.get_length() * IMG_LENGTH
     WINDOW_HEIGHT = BOARD_HEIGHT + MOUSE_AREA_HEIGHT + MSG_BOX_HEIGHT
     PADDING = 20
+    CHIP_TOP = 30  # Distance from the top of the mouse area to the chip shown above a column.
+
+    # Text Constants
+    FONT_SIZE = 36
+    TEXT_COLOR = (0, 0, 0)
+    MAX_CACHED_MESSAGES = 64  # Rendered messages kept before the cache is cleared.
 
-    def __init__(self):
+    def __init__(self, ai_workers=None, record_path=None):
         """
         Generate a game object and start the game.
+        :param ai_workers: the number of processes to run the AI's search on, 0 for one per CPU
+            core, or None to search on a single thread.
+        :param record_path: the game record file to add the game to, or None to not record it.
         """
+        pygame.mixer.pre_init(44100, 16, 2, 4096)
+        pygame.init()
+        self.assets = Assets()
         self.board = Board()
         self.game_over = False
         self.player_one = None  # Human is player one.
         self.player_two = None  # AI is player two.
         self.control = 0
+        self.ai_thread = None  # Thread running the AI's search, while the AI is thinking.
+        self.ai_moves = queue.Queue()  # SearchResults of the AI's search thread.
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.Font(None, self.FONT_SIZE)
+        self.messages = {}  # Rendered message surfaces, keyed by text.
+        self.msg_text = None  # Text shown in the message box.
+        self.chip_rect = None  # Where the chip above the mouse's column is drawn, or None.
+        self.dirty = []  # Rectangles drawn since the window was last updated.
         # Randomly Choose order of play
         self.decide_first_player()
-        self.minimax = MiniMax(self.player_one, self.player_two)
+        self.recorder = self.open_recorder(record_path)
+        self.minimax = MiniMax(self.player_one, self.player_two, book=OpeningBook.open_default())
+        self.parallel = None  # The AI's parallel search, if it has worker processes.
+        if ai_workers is not None:
+            self.parallel = ParallelMiniMax(self.player_one, self.player_two, ai_workers or None)
         self.window = self.init_window()
         pygame.display.flip()
+        self.dirty = []
         self.begin()
 
+    def open_recorder(self, path):
+        """
+        :param path: the game record file to add the game to, or None to not record it.
+        :return: a GameRecordWriter with the game started, or None if the game is not recorded.
+        """
+        if path is None:
+            return None
+        try:
+            recorder = GameRecordWriter(path, self.board.get_geometry(), stats=True)
+        except (ValueError, OSError) as error:
+            sys.stderr.write(str(error) + "\nThis game will not be recorded.\n")
+            return None
+        recorder.start_game(self.PLAYER_MOVE_FIRST)
+        return recorder
+
+    def record_move(self, col, result=None):
+        """
+        Add a move to the game record, if the game is recorded.
+        :param col: the column of the move.
+        :param result: the AI's SearchResult for the move, or None.
+        """
+        if self.recorder is None:
+            return
+        if result is not None and result.get_score() is not None:
+            self.recorder.add_move(col, result.get_score(), result.get_depth(), result.nodes)
+        else:
+            self.recorder.add_move(col)
+
+    def record_end(self, result):
+        """
+        End the game in the game record, if the game is recorded.
+        :param result: the winner's piece, or GameRecord.DRAW.
+        """
+        if self.recorder is not None:
+            self.recorder.end_game(result)
+
     def init_window(self):
         """
         Generate an initialize pygame window of the 'Connect_5' game.
@@ -109,7 +203,8 @@ class Game:
         :param screen: The game screen
         """
         position = 0, 0
-        screen.blit(self.MOUSE_AREA_BACKGROUND, position)
+        self.dirty.append(screen.blit(self.assets.image(self.MOUSE_AREA_BACKGROUND), position))
+        self.chip_rect = None
 
     def decide_first_player(self):
         """
@@ -140,53 +235,98 @@ class Game:
         :param screen: The screen
         """
         bg_position = 0, self.MOUSE_AREA_HEIGHT
-        screen.blit(self.BOARD_BACKGROUND, bg_position)
-        screen.blit(self.BOARD_BACKGROUND_OVERLAY, bg_position)
+        screen.blit(self.assets.image(self.BOARD_BACKGROUND), bg_position)
+        screen.blit(self.assets.image(self.BOARD_BACKGROUND_OVERLAY), bg_position)
         for i in range(0, self.board.get_height()):
             for j in range(0, self.board.get_length()):
-                screen_position = j * self.IMG_LENGTH, (i * self.IMG_LENGTH) + self.MOUSE_AREA_HEIGHT
-                player = self.board.piece_at(i, j)
-                if player == self.PLAYER_MOVE_FIRST:
-                    screen.blit(self.RED_SPACE, screen_position)
-                elif player == self.PLAYER_MOVE_LAST:
-                    screen.blit(self.BLACK_SPACE, screen_position)
-                else:
-                    screen.blit(self.BLANK_SPACE, screen_position)
+                self.draw_space(screen, i, j)
+        self.dirty.append(pygame.Rect(bg_position, (self.BOARD_LENGTH, self.BOARD_HEIGHT)))
+
+    def draw_space(self, screen, row, col):
+        """
+        Draw the piece, or blank space, at one cell of the board over the board's background.
+        :param screen: The screen
+        :param row: the row of the cell.
+        :param col: the column of the cell.
+        :return: the rectangle drawn.
+        """
+        screen_position = col * self.IMG_LENGTH, (row * self.IMG_LENGTH) + self.MOUSE_AREA_HEIGHT
+        player = self.board.piece_at(row, col)
+        if player == self.PLAYER_MOVE_FIRST:
+            return screen.blit(self.assets.image(self.RED_SPACE), screen_position)
+        elif player == self.PLAYER_MOVE_LAST:
+            return screen.blit(self.assets.image(self.BLACK_SPACE), screen_position)
+        else:
+            return screen.blit(self.assets.image(self.BLANK_SPACE), screen_position)
+
+    def draw_last_move(self, screen):
+        """
+        Draw the cell the last piece was dropped into, instead of the whole board.
+        :param screen: The screen
+        """
+        piece, col, row = self.board.get_last_move()
+        area = pygame.Rect(col * self.IMG_LENGTH, row * self.IMG_LENGTH, self.IMG_LENGTH, self.IMG_LENGTH)
+        position = area.left, area.top + self.MOUSE_AREA_HEIGHT
+        screen.blit(self.assets.image(self.BOARD_BACKGROUND), position, area)
+        screen.blit(self.assets.image(self.BOARD_BACKGROUND_OVERLAY), position, area)
+        self.dirty.append(self.draw_space(screen, row, col))
+
+    def render_message(self, text):
+        """
+        :param text: the text of a message.
+        :return: the text rendered with the game's font, rendered once and then kept.
+        """
+        surface = self.messages.get(text)
+        if surface is None:
+            if len(self.messages) >= self.MAX_CACHED_MESSAGES:  # Progress messages are seldom shown twice.
+                self.messages.clear()
+            surface = self.font.render(text, 1, self.TEXT_COLOR)
+            self.messages[text] = surface
+        return surface
 
     def refresh_msg_box(self, screen, text):
         """
-        Refresh the message box with next text
+        Refresh the message box with next text, unless it already shows that text.
         :param screen: the game window
         :param text: the new text to display.
         """
+        if text == self.msg_text:
+            return
+        self.msg_text = text
         position = 0, (self.MOUSE_AREA_HEIGHT + self.BOARD_HEIGHT)
-        screen.blit(self.MSG_BOX_BACKGROUND, position)
-        screen.blit(self.MSG_BOX, position)
-        font = pygame.font.Font(None, 36)
-        msg_text = font.render(text, 1, (0, 0, 0))
+        screen.blit(self.assets.image(self.MSG_BOX_BACKGROUND), position)
+        self.dirty.append(screen.blit(self.assets.image(self.MSG_BOX), position))
         position = 20, (self.MOUSE_AREA_HEIGHT + self.BOARD_HEIGHT + self.PADDING)
-        screen.blit(msg_text, position)
+        screen.blit(self.render_message(text), position)
 
     def mouse_move_event(self, event, screen):
         """
-        Handles actions dealing with MOUSEMOTION event types.
+        Handles actions dealing with MOUSEMOTION event types. The chip is only drawn again
+        when the mouse moves to another column, or in or out of the mouse area.
         :param event: the MOUSEMOTION event
         :param screen: the game window.
         """
-        position = 0, 0
-        screen.blit(self.MOUSE_AREA_BACKGROUND, position)
+        chip_rect = None
         mouse_position = event.pos
         if self.control == self.player_one:  # show the player
             if self.in_mouse_area(mouse_position):
                 x = mouse_position[0]
                 col = x // self.IMG_LENGTH
-                position = (50 * col, 30)
-                if self.control == self.PLAYER_MOVE_FIRST:
-                    # Red's Move
-                    screen.blit(self.RED_CHIP, position)
-                else:
-                    # Black's Move
-                    screen.blit(self.BLACK_CHIP, position)
+                chip_rect = pygame.Rect(self.IMG_LENGTH * col, self.CHIP_TOP, self.IMG_LENGTH, self.IMG_LENGTH)
+        if chip_rect == self.chip_rect:
+            return
+        if self.chip_rect is not None:  # Cover the old chip with the background.
+            screen.blit(self.assets.image(self.MOUSE_AREA_BACKGROUND), self.chip_rect, self.chip_rect)
+            self.dirty.append(self.chip_rect)
+        self.chip_rect = chip_rect
+        if chip_rect is not None:
+            if self.control == self.PLAYER_MOVE_FIRST:
+                # Red's Move
+                screen.blit(self.assets.image(self.RED_CHIP), chip_rect)
+            else:
+                # Black's Move
+                screen.blit(self.assets.image(self.BLACK_CHIP), chip_rect)
+            self.dirty.append(chip_rect)
 
     def mouse_click_event(self, event, screen):
         """
@@ -198,28 +338,30 @@ class Game:
         if self.in_mouse_area(mouse_position):
             x = mouse_position[0]
             col = x // self.IMG_LENGTH
-            if self.board.can_drop(col)[0]:
+            if self.board.is_legal(col):
                 self.board.drop(self.control, col)
-                self.draw_board(screen)
-                self.DROP_SOUND.play()
-                winner = self.board.find_winner()
+                self.record_move(col)
+                self.draw_last_move(screen)
+                self.assets.play(self.DROP_SOUND)
+                winner = self.board.winner_after_last_move()
                 if winner == self.player_one:  # Winner Human Player
                     self.refresh_msg_box(screen, self.MSG_GAME_OVER + " " + self.MSG_YOU_WIN)
-                    self.WIN_SOUND.play()
+                    self.assets.play(self.WIN_SOUND)
                     self.game_over = True
+                    self.record_end(winner)
                     self.clear_mouse_area(screen)
                 elif self.board.is_filled():  # Tie, board is filled with no winner.
                     self.refresh_msg_box(screen, self.MSG_TIE + " " + self.MSG_GAME_OVER)
-                    self.LOSE_SOUND.play()
+                    self.assets.play(self.LOSE_SOUND)
                     self.game_over = True
+                    self.record_end(GameRecord.DRAW)
                     self.clear_mouse_area(screen)
                 else:  # Game continues
                     self.switch_players()
                     # Refresh Mouse Area with Correct Players Piece.
                     self.mouse_move_event(event, screen)
                     self.refresh_msg_box(screen, self.MSG_AI_TURN)
-                    pygame.display.flip()
-                    self.ai_take_turn(self.window)
+                    self.start_ai_turn()
             else:
                 self.refresh_msg_box(screen, self.MSG_INVALID_DROP)
 
@@ -234,37 +376,106 @@ class Game:
         # the x value doesn't matter.
         return 0 < y <= self.MOUSE_AREA_HEIGHT
 
-    def ai_take_turn(self, screen):
+    def start_ai_turn(self):
+        """
+        Start the AI's search for its move on a background thread, so the window keeps
+        responding while it thinks. The move is picked up by check_ai_turn. A cancel() from
+        before is cleared here, before the thread starts, so cancel_ai_turn can never be
+        undone by a search that starts after it.
+        """
+        self.minimax.reset_cancel()
+        if self.parallel is not None:
+            self.parallel.reset_cancel()
+        board = self.board.copy()
+        self.ai_thread = threading.Thread(target=self.ai_search, args=(board,))
+        self.ai_thread.daemon = True  # Never keep the program open after the window closes.
+        self.ai_thread.start()
+
+    def ai_search(self, board):
+        """
+        Search for the AI's move and queue it. Runs on the AI's search thread. If the search
+        fails, or is cancelled, an empty SearchResult is queued instead, so the game never waits
+        forever.
+        :param board: a copy of the game board.
+        """
+        try:
+            if self.parallel is not None:
+                result = self.parallel.search(board, self.AI_PARALLEL_DEPTH)
+            else:
+                result = self.minimax.search(board, self.AI_TIME_BUDGET_MS, self.AI_MAX_DEPTH)
+        except SearchTimeout:  # Cancelled, the window is closing.
+            result = SearchResult()
+        except Exception:
+            traceback.print_exc()
+            result = SearchResult()
+        self.ai_moves.put(result)
+
+    def cancel_ai_turn(self):
+        """
+        Stop the AI's search, if it is running, and wait for its thread to finish.
+        """
+        if self.ai_thread is not None:
+            self.minimax.cancel()
+            if self.parallel is not None:
+                self.parallel.cancel()
+            self.ai_thread.join()
+            self.ai_thread = None
+
+    def check_ai_turn(self, screen):
+        """
+        Make the AI's move if its search has finished, or show its progress if it has not.
+        :param screen: the game screen
+        """
+        try:
+            result = self.ai_moves.get_nowait()
+        except queue.Empty:
+            searcher = self.parallel if self.parallel is not None else self.minimax
+            depth, nodes = searcher.get_progress()
+            self.refresh_msg_box(screen, self.MSG_AI_THINKING.format(depth, nodes))
+            return
+        self.ai_thread.join()
+        self.ai_thread = None
+        col = result.get_best_col()
+        if col is not None:
+            self.ai_take_turn(screen, col, result)
+        else:  # The search failed, play any legal move instead.
+            self.ai_take_turn(screen, random.choice(self.board.legal_moves()))
+            if not self.game_over:
+                self.refresh_msg_box(screen, self.MSG_AI_FAILED)
+
+    def ai_take_turn(self, screen, col, result=None):
         """
         AI makes its move.
         :param screen: the game screen
+        :param col: the column the AI chose.
+        :param result: the SearchResult the column was chosen from, or None.
         """
-        node = BoardNode(self.board, MiniMax.NEG_INF)
-        best_board = self.minimax.mini_max(node, MiniMax.NEG_INF, MiniMax.INF, 3).get_board()
-        col = best_board.get_last_move()[1]
         self.board.drop(self.player_two, col)
-        winner = self.board.find_winner()
-        self.draw_board(screen)
-        self.DROP_SOUND.play()
+        self.record_move(col, result)
+        winner = self.board.winner_after_last_move()
+        self.draw_last_move(screen)
+        self.assets.play(self.DROP_SOUND)
         if winner == self.player_two:  # AI player
             self.refresh_msg_box(screen, self.MSG_GAME_OVER + " " + self.MSG_AI_WIN)
-            self.LOSE_SOUND.play()
+            self.assets.play(self.LOSE_SOUND)
             self.game_over = True
+            self.record_end(winner)
             self.clear_mouse_area(screen)
         elif self.board.is_filled():  # Tie, board is filled with no winner.
             self.refresh_msg_box(screen, self.MSG_TIE + " " + self.MSG_GAME_OVER)
-            self.LOSE_SOUND.play()
+            self.assets.play(self.LOSE_SOUND)
             self.game_over = True
+            self.record_end(GameRecord.DRAW)
             self.clear_mouse_area(screen)
         else:
             self.switch_players()
             self.refresh_msg_box(screen, self.MSG_YOUR_TURN)
-        self.minimax.heuristic_finder.heuristic(self.board)
 
     def begin(self):
         """
-        Begin the game, as of right now it is not playable however holding and releasing keys
-        changes the text in the message box.
+        Run the game loop until the window is closed. The loop runs at most FRAME_RATE times a
+        second, sleeping in between, and only copies the dirty rectangles to the window. The AI
+        thinks on its own thread, so the window never stops responding.
         """
         window_open = True
         while window_open:
@@ -278,11 +489,36 @@ class Game:
                             self.mouse_move_event(event, self.window)
                         if event.type == pygame.MOUSEBUTTONUP:
                             self.mouse_click_event(event, self.window)
+            if window_open and not self.game_over and self.control == self.player_two:  # AI's turn
+                if self.ai_thread is None:
+                    self.start_ai_turn()
                 else:
-                    if not self.game_over:  # if AI goes first.
-                        self.ai_take_turn(self.window)
-            pygame.display.flip()
+                    self.check_ai_turn(self.window)
+            if self.dirty:
+                pygame.display.update(self.dirty)
+                self.dirty = []
+            self.clock.tick(self.FRAME_RATE)
+        self.cancel_ai_turn()
+        if self.parallel is not None:
+            self.parallel.close()
+        if self.recorder is not None:
+            self.recorder.close()  # Writes an unfinished game and the file's index.
+
+    @staticmethod
+    def main(argv=None):
+        """
+        Start a game from the command line.
+        :param argv: the command line arguments, or None for sys.argv.
+        """
+        parser = argparse.ArgumentParser(description="Play Connect 5 against the computer.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="run the AI's search on this many processes, 0 for one per core")
+        parser.add_argument("--record", nargs="?", const=GameRecord.DEFAULT_PATH, default=None,
+                            help="add the game to a game record file, games.c5r if no file is given")
+        args = parser.parse_args(argv)
+        # Create a game, which starts it.
+        Game(args.workers, args.record)
 
 
-# Create a game, which starts it.
-g = Game()
+if __name__ == "__main__":
+    Game.main()
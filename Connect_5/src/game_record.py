@@ -0,0 +1,376 @@
+from src.board import Board
+import math
+import mmap
+import os
+import struct
+
+__author__ = 'Bill'
+
+
+class GameRecord:
+    """
+    A played game: who moved first, the column of every move, how the game ended and,
+    if they were kept, the search stats of each move. Game records are written to a
+    file one game at a time by GameRecordWriter and read back by GameRecordReader.
+
+    The file starts with a header giving the board geometry and how moves are stored.
+    Each game follows as a short game header and then its moves, two to a byte when
+    every column fits in four bits and one to a byte otherwise, followed by a stats
+    record for each move when the file keeps stats. When the writer is closed it adds
+    an index of where every game starts and a trailer pointing at the index, so a game
+    can be found by number without reading the ones before it. A file whose writer
+    never closed, or is still writing, has no index but can still be read from the start.
+    """
+
+    # Class Constants
+    MAGIC = b"C5GR"  # First bytes of every game record file.
+    INDEX_MAGIC = b"C5IX"  # Last bytes of a file with an index.
+    VERSION = 1
+    HEADER = struct.Struct("<4sHBBBB")  # Magic, version, width, height, score to win, flags.
+    GAME_HEADER = struct.Struct("<HBB")  # Move count, first player code, result code.
+    STATS = struct.Struct("<fBI")  # Score, search depth, nodes searched.
+    OFFSET = struct.Struct("<Q")  # Index entry, the file offset of a game.
+    TRAILER = struct.Struct("<QI4s")  # Index offset, game count, index magic.
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "games.c5r")
+
+    # Header Flags
+    FLAG_NIBBLES = 1  # Moves are packed two to a byte.
+    FLAG_STATS = 2  # Every move has a stats record.
+
+    # Results
+    UNFINISHED = "unfinished"  # The game stopped before anyone won or the board was filled.
+    DRAW = "draw"  # The board was filled with no winner.
+    PIECE_CODES = {Board.PLAYER_ONE: 1, Board.PLAYER_TWO: 2}
+    RESULT_CODES = {UNFINISHED: 0, Board.PLAYER_ONE: 1, Board.PLAYER_TWO: 2, DRAW: 3}
+    PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+    RESULTS = {code: result for result, code in RESULT_CODES.items()}
+
+    __slots__ = ("first_player", "moves", "result", "stats")
+
+    def __init__(self, first_player, moves, result, stats=None):
+        """
+        Create a game record.
+        :param first_player: the piece of the player who moved first.
+        :param moves: a list of the column of every move, oldest first.
+        :param result: the piece of the winner, DRAW or UNFINISHED.
+        :param stats: a list of (score, depth, nodes) for every move, with None for moves made
+            without a search, or None if no stats were kept.
+        """
+        self.first_player = first_player
+        self.moves = moves
+        self.result = result
+        self.stats = stats
+
+    @staticmethod
+    def result_of(board):
+        """
+        :param board: a board.
+        :return: the result of the game on the board, the piece of the winner, DRAW or UNFINISHED.
+        """
+        winner = board.find_winner()
+        if winner is not None:
+            return winner
+        if board.is_filled():
+            return GameRecord.DRAW
+        return GameRecord.UNFINISHED
+
+    def get_moves(self):
+        """
+        :return: a list of (piece, column) pairs for every move, oldest first, like Board.get_moves.
+        """
+        pieces = (self.first_player, Board.OPPONENT[self.first_player])
+        return [(pieces[index % 2], col) for index, col in enumerate(self.moves)]
+
+    def replay(self, geometry=Board.GEOMETRY):
+        """
+        :param geometry: the (width, height, win length) of the board the game was played on.
+        :return: a board with every move of the game made on it.
+        """
+        board = Board(*geometry)
+        for piece, col in self.get_moves():
+            board.drop(piece, col)
+        return board
+
+
+class GameRecordWriter:
+    """
+    Writes games to a game record file as they are played. Moves are added one at a time
+    and each game is written and flushed as soon as it ends, so the file holds every
+    finished game even if the program stops. Opening an existing file adds to it.
+    """
+
+    def __init__(self, path=GameRecord.DEFAULT_PATH, geometry=Board.GEOMETRY, stats=False):
+        """
+        Open a game record file for writing, creating it if it does not exist.
+        :param path: the path of the file.
+        :param geometry: the (width, height, win length) of the board the games are played on.
+        :param stats: true to keep the search stats of every move.
+        """
+        width, height, score_to_win = geometry
+        if width > 0xFF:
+            raise ValueError("Game records hold at most 255 columns, got " + str(width))
+        flags = GameRecord.FLAG_NIBBLES if width <= 0xF else 0
+        if stats:
+            flags |= GameRecord.FLAG_STATS
+        self.path = path
+        self.geometry = geometry
+        self.flags = flags
+        self.offsets = []  # File offset of every game.
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with GameRecordReader(path) as reader:
+                if reader.geometry != tuple(geometry) or reader.flags != flags:
+                    raise ValueError("Game record file is for a different board or format: " + path)
+                self.offsets = reader.get_offsets()
+                end = reader.data_end
+            self.file = open(path, "r+b")
+            self.file.truncate(end)  # Drops the index, which is written again on close.
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(GameRecord.HEADER.pack(GameRecord.MAGIC, GameRecord.VERSION, width, height,
+                                                   score_to_win, flags))
+            self.file.flush()
+        self.first_player = None  # First player of the game being played, or None between games.
+        self.moves = []
+        self.stats = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def start_game(self, first_player):
+        """
+        Start recording a new game. A game still being recorded is written as unfinished.
+        :param first_player: the piece of the player who moves first.
+        """
+        if self.first_player is not None:
+            self.end_game(GameRecord.UNFINISHED)
+        self.first_player = first_player
+        self.moves = []
+        self.stats = []
+
+    def add_move(self, col, score=None, depth=0, nodes=0):
+        """
+        Record the next move of the game being played.
+        :param col: the column of the move.
+        :param score: the search's score for the move, or None if it was not searched.
+        :param depth: the depth the move was searched to.
+        :param nodes: the number of nodes searched.
+        """
+        self.moves.append(col)
+        self.stats.append(None if score is None else (score, depth, nodes))
+
+    def end_game(self, result):
+        """
+        Write the game being played to the file.
+        :param result: the piece of the winner, GameRecord.DRAW or GameRecord.UNFINISHED.
+        """
+        self.write_game(GameRecord(self.first_player, self.moves, result, self.stats))
+        self.first_player = None
+        self.moves = []
+        self.stats = []
+
+    def write_board(self, board, stats=None):
+        """
+        Write the game played on a board, read from its move stack.
+        :param board: the board.
+        :param stats: a list of (score, depth, nodes) or None for every move, or None.
+        """
+        moves = board.get_moves()
+        first_player = moves[0][0] if moves else Board.PLAYER_ONE
+        self.write_game(GameRecord(first_player, [col for piece, col in moves], GameRecord.result_of(board), stats))
+
+    def write_game(self, record):
+        """
+        Write a whole game to the file and flush it.
+        :param record: the GameRecord of the game.
+        """
+        moves = record.moves
+        data = bytearray(GameRecord.GAME_HEADER.pack(len(moves), GameRecord.PIECE_CODES[record.first_player],
+                                                     GameRecord.RESULT_CODES[record.result]))
+        if self.flags & GameRecord.FLAG_NIBBLES:
+            for index in range(0, len(moves), 2):
+                high = moves[index + 1] if index + 1 < len(moves) else 0
+                data.append(moves[index] | high << 4)
+        else:
+            data += bytes(moves)
+        if self.flags & GameRecord.FLAG_STATS:
+            stats = record.stats or [None] * len(moves)
+            for move_stats in stats:
+                if move_stats is None:
+                    data += GameRecord.STATS.pack(math.nan, 0, 0)
+                else:
+                    score, depth, nodes = move_stats
+                    data += GameRecord.STATS.pack(score, min(depth, 0xFF), min(nodes, 0xFFFFFFFF))
+        self.offsets.append(self.file.tell())
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        """
+        Write any game still being recorded as unfinished, then the index, and close the file.
+        """
+        if self.file is None:
+            return
+        if self.first_player is not None and self.moves:
+            self.end_game(GameRecord.UNFINISHED)
+        index_offset = self.file.tell()
+        for offset in self.offsets:
+            self.file.write(GameRecord.OFFSET.pack(offset))
+        self.file.write(GameRecord.TRAILER.pack(index_offset, len(self.offsets), GameRecord.INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class GameRecordReader:
+    """
+    Reads a game record file through mmap. Games are decoded one at a time as they are
+    asked for, so iterating over a file of millions of games never holds more than one
+    in memory. Iterating walks the games in order, and finding a game by number reads
+    its offset from the index, or from a list of offsets found by walking the file once
+    if it has no index.
+    """
+
+    def __init__(self, path=GameRecord.DEFAULT_PATH):
+        """
+        Open a game record file.
+        :param path: the path of the file.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file cannot be mapped.
+            self.file.close()
+            raise ValueError("Not a game record file: " + path)
+        if len(self.data) < GameRecord.HEADER.size:
+            self.close()
+            raise ValueError("Not a game record file: " + path)
+        magic, version, width, height, score_to_win, flags = GameRecord.HEADER.unpack_from(self.data, 0)
+        if magic != GameRecord.MAGIC or version != GameRecord.VERSION:
+            self.close()
+            raise ValueError("Not a game record file, or an unsupported version: " + path)
+        self.geometry = (width, height, score_to_win)
+        self.flags = flags
+        self.index_offset = None  # File offset of the index, or None if the file has no index.
+        self.offsets = None  # File offset of every game in a file without an index, found on first use.
+        self.data_end = len(self.data)  # End of the last whole game.
+        if len(self.data) >= GameRecord.HEADER.size + GameRecord.TRAILER.size:
+            index_offset, count, index_magic = GameRecord.TRAILER.unpack_from(
+                self.data, len(self.data) - GameRecord.TRAILER.size)
+            if (index_magic == GameRecord.INDEX_MAGIC and
+                    index_offset + count * GameRecord.OFFSET.size + GameRecord.TRAILER.size == len(self.data)):
+                self.index_offset = index_offset
+                self.count = count
+                self.data_end = index_offset
+        if self.index_offset is None:
+            self.count = sum(1 for offset in self.scan())  # Also finds data_end.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.games()
+
+    def close(self):
+        """
+        Close the file.
+        """
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def game_size(self, count):
+        """
+        :param count: the number of moves in a game.
+        :return: the number of bytes the game takes up, including its game header.
+        """
+        size = GameRecord.GAME_HEADER.size
+        size += (count + 1) // 2 if self.flags & GameRecord.FLAG_NIBBLES else count
+        if self.flags & GameRecord.FLAG_STATS:
+            size += count * GameRecord.STATS.size
+        return size
+
+    def scan(self):
+        """
+        Walk the games from the start of the file. A game cut off by the end of the file, which
+        only happens to a file without an index, is left out, and data_end is set to where it starts.
+        :return: a generator of the file offset of every whole game.
+        """
+        offset = GameRecord.HEADER.size
+        while offset + GameRecord.GAME_HEADER.size <= self.data_end:
+            count = GameRecord.GAME_HEADER.unpack_from(self.data, offset)[0]
+            size = self.game_size(count)
+            if offset + size > self.data_end:
+                break
+            yield offset
+            offset += size
+        self.data_end = offset
+
+    def get_offsets(self):
+        """
+        :return: a list of the file offset of every game.
+        """
+        if self.index_offset is not None:
+            return [offset for offset, in GameRecord.OFFSET.iter_unpack(
+                self.data[self.index_offset:self.index_offset + self.count * GameRecord.OFFSET.size])]
+        if self.offsets is None:
+            self.offsets = list(self.scan())
+        return self.offsets
+
+    def game_at(self, offset):
+        """
+        :param offset: the file offset of a game.
+        :return: the GameRecord of the game.
+        """
+        data = self.data
+        count, first_code, result_code = GameRecord.GAME_HEADER.unpack_from(data, offset)
+        offset += GameRecord.GAME_HEADER.size
+        if self.flags & GameRecord.FLAG_NIBBLES:
+            packed = data[offset:offset + (count + 1) // 2]
+            moves = []
+            for byte in packed:
+                moves.append(byte & 0xF)
+                moves.append(byte >> 4)
+            del moves[count:]
+            offset += len(packed)
+        else:
+            moves = list(data[offset:offset + count])
+            offset += count
+        stats = None
+        if self.flags & GameRecord.FLAG_STATS:
+            stats = []
+            for score, depth, nodes in GameRecord.STATS.iter_unpack(data[offset:offset + count * GameRecord.STATS.size]):
+                stats.append(None if math.isnan(score) else (score, depth, nodes))
+        return GameRecord(GameRecord.PIECES[first_code], moves, GameRecord.RESULTS[result_code], stats)
+
+    def game(self, index):
+        """
+        :param index: the number of the game, counting from 0 in the order they were written.
+        :return: the GameRecord of the game.
+        """
+        if not 0 <= index < self.count:
+            raise IndexError("No game " + str(index) + " in " + self.path)
+        if self.index_offset is not None:
+            return self.game_at(GameRecord.OFFSET.unpack_from(self.data, self.index_offset +
+                                                              index * GameRecord.OFFSET.size)[0])
+        return self.game_at(self.get_offsets()[index])
+
+    def games(self):
+        """
+        :return: a generator of the GameRecord of every game, in the order they were written.
+        """
+        for offset in self.scan():
+            yield self.game_at(offset)
@@ -3,9 +3,17 @@ __author__ = "Bill"
 
 class HeuristicFinder:
     """
-    Used to find heuristic values of a Connect 5 Game Board
+    Used to find heuristic values of a Connect 5 Game Board. Runs are counted relative to
+    the board's win length, so on the default board threats are 4 in a row, and the
+    bonuses for pieces in the center and corners of the bottom row are worked out once
+    for each board geometry.
     """
 
+    # Class Constants
+    CENTER_BONUS = 50  # Value of a piece in the center of the bottom row.
+    CORNER_BONUS = 15  # Value of a piece in a corner of the bottom row.
+    POSITION_WEIGHTS = {}  # (cell bit, bonus) pairs of the vital cells, keyed by board geometry.
+
     def __init__(self, human_player, ai_player):
         """
         Create a HeurisiticFinder object.
@@ -15,6 +23,25 @@ class HeuristicFinder:
         self.ai_player = ai_player
         self.human_player = human_player
 
+    @staticmethod
+    def position_weights(board):
+        """
+        :param board: a Connect 5 Board object.
+        :return: the (cell bit, bonus) pairs of the vital cells on boards of the board's geometry,
+            the center of the bottom row, which is two cells on boards with an even number of
+            columns, and its corners.
+        """
+        weights = HeuristicFinder.POSITION_WEIGHTS.get(board.get_geometry())
+        if weights is None:
+            row = board.get_height() - 1
+            length = board.get_length()
+            centers = sorted({(length - 1) // 2, length // 2})
+            corners = sorted({0, length - 1} - set(centers))
+            weights = tuple([(board.cell_bit(row, col), HeuristicFinder.CENTER_BONUS) for col in centers] +
+                            [(board.cell_bit(row, col), HeuristicFinder.CORNER_BONUS) for col in corners])
+            HeuristicFinder.POSITION_WEIGHTS[board.get_geometry()] = weights
+        return weights
+
     def heuristic(self, board):
         """
         Find the heuristic value of a Connect 5 board.
@@ -25,25 +52,30 @@ class HeuristicFinder:
                 -10000 - Board where AI loses.
                 0  - Tie
         """
+        winner = board.winner_after_last_move()
         if board.is_filled():
             return 0
-        elif board.find_winner() == self.ai_player:  # AI Wins
+        elif winner == self.ai_player:  # AI Wins
             return 10000
-        elif board.find_winner() == self.human_player:  # AI Loses
+        elif winner == self.human_player:  # AI Loses
             return -10000
         else:
-            ai_four_in_row = board.find_n_in_a_row(self.ai_player, 4)
-            ai_three_in_row = board.find_n_in_a_row(self.ai_player, 3)
-            ai_two_in_row = board.find_n_in_a_row(self.ai_player, 2)
+            # The board keeps these counts up to date on every drop, so reading them is constant time.
+            # Runs are one, two and three pieces short of a win, four, three and two in a row on the
+            # default board.
+            win_length = board.SCORE_TO_WIN
+            ai_four_in_row = board.get_run_count(self.ai_player, win_length - 1)
+            ai_three_in_row = board.get_run_count(self.ai_player, win_length - 2)
+            ai_two_in_row = board.get_run_count(self.ai_player, win_length - 3)
 
-            human_four_in_row = board.find_n_in_a_row(self.human_player, 4)
-            human_three_in_row = board.find_n_in_a_row(self.human_player, 3)
-            human_two_in_row = board.find_n_in_a_row(self.human_player, 2)
+            human_four_in_row = board.get_run_count(self.human_player, win_length - 1)
+            human_three_in_row = board.get_run_count(self.human_player, win_length - 2)
+            human_two_in_row = board.get_run_count(self.human_player, win_length - 3)
 
             # Number of potential wins that can happen if one of the players fills in a blank spot
-            # between 4 or more of its own pieces.
-            ai_unconnected_wins = board.find_disconnected_wins(self.ai_player)
-            human_unconnected_wins = board.find_disconnected_wins(self.human_player)
+            # between pieces of its own that make one short of a win.
+            ai_unconnected_wins = board.get_disconnected_wins(self.ai_player)
+            human_unconnected_wins = board.get_disconnected_wins(self.human_player)
 
             ai_threats = ai_four_in_row + ai_unconnected_wins
             human_threats = human_four_in_row + human_unconnected_wins
@@ -54,24 +86,13 @@ class HeuristicFinder:
             bonus = 0
 
             # Values for center and corners, vital pieces
-            center = board.piece_at(6, 4)
-            left_corner = board.piece_at(6, 0)
-            right_corner = board.piece_at(6, 8)
-
-            if self.ai_player == center:  # center
-                bonus += 50
-            elif self.human_player == center:
-                bonus -= 50
-
-            if self.ai_player == left_corner:  # center
-                bonus += 15
-            elif self.human_player == left_corner:
-                bonus -= 15
-
-            if self.ai_player == right_corner:  # center
-                bonus += 15
-            elif self.human_player == right_corner:
-                bonus -= 15
+            ai_pieces = board.mask_of(self.ai_player)
+            human_pieces = board.mask_of(self.human_player)
+            for bit, value in self.position_weights(board):
+                if ai_pieces & bit:
+                    bonus += value
+                elif human_pieces & bit:
+                    bonus -= value
 
             heuristic += bonus
             return heuristic
@@ -1,26 +1,35 @@
-from src.board_node import *
+from src.board_node import BoardNode
 
 __author__ = 'Bill'
 
 
 class MaxBoardNode(BoardNode):
     """
-    Nodes used in the Minimax algorithm. Each node contains a board, a heuristic value,
-    and zero or more children.
+    A max node in the Minimax algorithm, which also keeps its alpha value.
     """
 
+    __slots__ = ("alpha",)
+
     def __init__(self, board, heuristic, alpha, parent=None):
         """
         Create a BoardNode for the minimax algorithm
         :param board: this node's board.
         :param heuristic: this node's heuristic value
         :param alpha: this max_node's alpha value.
+        :param parent: the node this node's board was reached from, or None.
         """
         BoardNode.__init__(self, board, heuristic, parent)
         self.alpha = alpha
 
     def get_alpha(self):
+        """
+        :return: this node's alpha value
+        """
         return self.alpha
 
     def set_alpha(self, a):
+        """
+        Set a new alpha value
+        :param a: the new alpha value
+        """
         self.alpha = a
@@ -1,26 +1,35 @@
-from src.board_node import *
+from src.board_node import BoardNode
 
 __author__ = 'Bill'
 
 
 class MinBoardNode(BoardNode):
     """
-    Nodes used in the Minimax algorithm. Each node contains a board, a heuristic value,
-    and zero or more children.
+    A min node in the Minimax algorithm, which also keeps its beta value.
     """
 
+    __slots__ = ("beta",)
+
     def __init__(self, board, heuristic, beta, parent=None):
         """
         Create a BoardNode for the minimax algorithm
         :param board: this node's board.
         :param heuristic: this node's heuristic value
-        :param alpha: this max_node's alpha value.
+        :param beta: this min_node's beta value.
+        :param parent: the node this node's board was reached from, or None.
         """
-        BoardNode.__init__(self, board, heuristic,parent)
+        BoardNode.__init__(self, board, heuristic, parent)
         self.beta = beta
 
     def get_beta(self):
+        """
+        :return: this node's beta value
+        """
         return self.beta
 
     def set_beta(self, b):
+        """
+        Set a new beta value
+        :param b: the new beta value
+        """
         self.beta = b
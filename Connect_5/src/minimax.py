@@ -1,7 +1,13 @@
-from src.heuristicFinder import *
-from src.board import *
-from src.board_node import *
-import copy
+from src.heuristicFinder import HeuristicFinder
+from src.min_board_node import MinBoardNode
+from src.transposition_table import TranspositionTable
+from src.search_result import SearchResult
+from src.move_ordering import MoveOrderer
+from src.search_timeout import SearchTimeout
+from src.endgame_solver import EndgameSolver
+from src.threats import ThreatFinder
+from src.search_stats import SearchStats
+import time
 
 __author__ = 'Bill'
 
@@ -10,21 +16,211 @@ class MiniMax:
     """
     Apply the mini-max algorithm and use it to decide on the AI's moves.
     Assume AI is always max and human is always min.
+
+    The search plays and takes back moves on a single board instead of copying
+    the board for every child, so the only node it creates is the one returned
+    for the best move. Searched positions are kept in a transposition table so
+    positions reached through different move orders are only searched once, and
+    a MoveOrderer decides which columns are tried first. With pvs set, only the first
+    move at each node is searched with the full window, and the rest are searched with
+    a null window that only tells whether they are better, then searched again if so. Once few enough cells are
+    left, search() hands the position to an EndgameSolver for an exact result. Before
+    that, a ThreatFinder plays wins, blocks and double threats without a search and
+    leaves moves that let the human win straight away out of it. The table is keyed by the
+    board's canonical key, so a position and its mirror image share an entry.
+
+    Every search fills in a SearchStats, and set_hooks() can add functions that are
+    called for every node, every cutoff and every completed iteration.
     """
 
     # Class constants
     INF = float("inf")  # infinity
     NEG_INF = - float("inf")  # -infinity
+    WIN_SCORE = 10000  # Heuristic value of a won game.
+    DEFAULT_TIME_BUDGET_MS = 1000  # Time allowed for an iterative deepening search.
+    DEFAULT_MAX_DEPTH = 12  # Deepest iteration of an iterative deepening search.
+    TIME_CHECK_INTERVAL = 256  # Nodes searched between clock checks, must be a power of two.
+    DEFAULT_ENDGAME_THRESHOLD = 14  # Most blank cells a position can have to be solved exactly.
+    ENDGAME_TIME_SHARE = 0.5  # Part of the time budget the endgame solver can use.
+    NULL_WINDOW = 0.5  # Smallest difference between two heuristic values.
+    ASPIRATION_WINDOW = 50  # Distance from the last iteration's score to each side of an aspiration window.
 
-    def __init__(self, p1, p2):
+    def __init__(self, p1, p2, table=None, orderer=None, book=None):
         """
         Set up the minimax algorithm
         :param p1: the piece vlue for the human player.
         :param p2: the piece value for the ai.
+        :param table: the TranspositionTable to use, or None for a table with the default settings.
+        :param orderer: the MoveOrderer to use, or None for an orderer with the default settings.
+        :param book: the OpeningBook that search() looks positions up in first, or None for no book.
         """
         self.human = p1
         self.ai = p2
         self.heuristic_finder = HeuristicFinder(p1, self.ai)
+        self.threat_finder = ThreatFinder(p1, self.ai)
+        if table is None:
+            table = TranspositionTable()
+        self.table = table
+        if orderer is None:
+            orderer = MoveOrderer()
+        self.orderer = orderer
+        self.book = book
+        self.solver = EndgameSolver()
+        self.endgame_threshold = self.DEFAULT_ENDGAME_THRESHOLD  # 0 turns the endgame solver off.
+        self.solving = False  # True while the endgame solver is running.
+        self.root_ply = 0  # Number of moves on the board at the root of the search.
+        self.root_moves = None  # Columns searched at the root, or None for every column.
+        self.pvs = True  # Search moves after the first with a null window.
+        self.aspiration = False  # Start iterations of search() with a window around the last score.
+        self.pv = []  # pv[ply] is the best line found from the node being searched at each ply.
+        self.last_pv = []  # Principal variation of the last completed search or iteration.
+        self.nodes = 0  # Nodes searched since the search started.
+        self.deadline = None  # Time the search has to stop by, or None for no limit.
+        self.stop_requested = False  # Set by cancel() to stop a running search.
+        self.current_depth = 0  # Depth of the iteration being searched.
+        self.stats = SearchStats()  # Counts for the current or last search.
+        self.on_node = None  # Called as on_node(board, ply, depth) for every node, or None.
+        self.on_cutoff = None  # Called as on_cutoff(board, ply, col, index) for every cutoff, or None.
+        self.on_iteration = None  # Called as on_iteration(iteration) after each iteration, or None.
+
+    def set_hooks(self, on_node=None, on_cutoff=None, on_iteration=None):
+        """
+        Set the functions called while searching. A hook left as None costs nothing but a check.
+        :param on_node: called as on_node(board, ply, depth) for every node searched, where board
+            must not be changed and depth is the depth left to search.
+        :param on_cutoff: called as on_cutoff(board, ply, col, index) for every cutoff, where col
+            is the cutting move and index is its position in the order the moves were tried.
+        :param on_iteration: called as on_iteration(iteration) after each completed iteration of
+            an iterative deepening search, with the iteration's dictionary from SearchResult.
+        """
+        self.on_node = on_node
+        self.on_cutoff = on_cutoff
+        self.on_iteration = on_iteration
+
+    def search(self, board, time_budget_ms=DEFAULT_TIME_BUDGET_MS, max_depth=DEFAULT_MAX_DEPTH):
+        """
+        Iterative deepening search for the AI's move. Searches to depth 1, 2, 3, ... until
+        max_depth is reached or time runs out, and keeps the best move of the deepest completed
+        iteration. The first iteration always completes unless the search is cancelled, so a move
+        is found whenever one exists. While the search runs, get_progress() can be called from
+        another thread, and cancel() stops it, or stops it as soon as it starts if it is called
+        first, until reset_cancel() is called. Positions in the opening book are not searched,
+        nor are moves the ThreatFinder decides, and positions with endgame_threshold or fewer
+        blank cells are solved exactly, unless the solver runs out of its share of the time,
+        when they are searched as usual. With aspiration set, each iteration after the first
+        starts with a window around the last iteration's score.
+        :param board: the board to move on, which is not modified.
+        :param time_budget_ms: the time allowed for the search in milliseconds.
+        :param max_depth: the deepest iteration to run.
+        :return: a SearchResult with the best move and a report of every iteration.
+        """
+        result = SearchResult()
+        self.stats = SearchStats()
+        result.stats = self.stats
+        if self.book is not None:
+            start = time.perf_counter()
+            found = self.book.probe(board, self.ai)
+            if found is not None:
+                col, depth, score = found
+                result.add_iteration(depth, col, score, 0, (time.perf_counter() - start) * 1000.0)
+                result.from_book = True
+                return result
+        board = board.copy()
+        self.orderer.new_search(board)
+        self.table.new_search()
+        self.root_moves = None
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+        if board.winner_after_last_move() is None and not board.is_filled():
+            start = time.perf_counter()
+            col, found = self.threat_finder.check(board)
+            if col is None:  # Nothing decides the move, found is the list of moves worth searching.
+                self.root_moves = found
+            else:
+                if found in (ThreatFinder.WIN, ThreatFinder.DOUBLE_THREAT):
+                    score = self.WIN_SCORE
+                else:
+                    board.drop(self.ai, col)
+                    score = self.heuristic_finder.heuristic(board)
+                    board.undo()
+                result.add_iteration(1, col, score, 0, (time.perf_counter() - start) * 1000.0)
+                result.threat = found
+                return result
+        if EndgameSolver.empty_cells(board) <= self.endgame_threshold and board.winner_after_last_move() is None:
+            if self.solve(board, time.perf_counter() + time_budget_ms * self.ENDGAME_TIME_SHARE / 1000.0, result):
+                return result
+        score = None
+        for depth in range(1, max_depth + 1):
+            iteration_start = time.perf_counter()
+            self.nodes = 0
+            self.current_depth = depth
+            self.deadline = deadline if depth > 1 else None
+            try:
+                best_col, score = self.search_iteration(board, depth, score)
+            except SearchTimeout:  # The board copy is left mid-search, but it is not used again.
+                result.nodes += self.nodes
+                result.timed_out = True
+                break
+            finally:
+                self.deadline = None
+            elapsed_ms = (time.perf_counter() - iteration_start) * 1000.0
+            result.add_iteration(depth, best_col, score, self.nodes, elapsed_ms, self.last_pv)
+            self.stats.record_iteration(depth, self.nodes, elapsed_ms)
+            if self.on_iteration is not None:
+                self.on_iteration(result.get_iterations()[-1])
+            if best_col is None or abs(score) >= self.WIN_SCORE:  # No moves, or the game is decided.
+                break
+        return result
+
+    def search_iteration(self, board, depth, last_score):
+        """
+        Search to a fixed depth. With aspiration set and a last score that is not a win or loss,
+        the search starts with a window around the last score, and is searched again with the
+        full window if the score falls outside it.
+        :param board: the board to search, which is restored before returning.
+        :param depth: the depth of the search.
+        :param last_score: the score of the last iteration, or None.
+        :return: the best column, or None if no move can be made, and its heuristic value.
+        """
+        if self.aspiration and last_score is not None and abs(last_score) < self.WIN_SCORE:
+            alpha = last_score - self.ASPIRATION_WINDOW
+            beta = last_score + self.ASPIRATION_WINDOW
+            best_col, score = self.search_root(board, alpha, beta, depth)
+            if alpha < score < beta:
+                return best_col, score
+            self.stats.aspiration_researches += 1
+        return self.search_root(board, self.NEG_INF, self.INF, depth)
+
+    def solve(self, board, deadline, result):
+        """
+        Solve the position exactly with the endgame solver. A won position scores WIN_SCORE and a
+        lost one -WIN_SCORE, and the result's distance is the number of moves until the end.
+        :param board: the board to move on, which is restored before returning.
+        :param deadline: the time.perf_counter() value the solver has to stop by.
+        :param result: the SearchResult to add the solution to.
+        :return: true if the position was solved, or false if the solver ran out of time.
+        """
+        start = time.perf_counter()
+        empty = EndgameSolver.empty_cells(board)
+        self.current_depth = empty
+        self.solving = True
+        try:
+            col, value = self.solver.solve(board, self.ai, deadline)
+        except SearchTimeout:
+            result.nodes += self.solver.nodes
+            return False
+        finally:
+            self.solving = False
+        if col is None:
+            return False
+        score = self.WIN_SCORE if value > 0 else -self.WIN_SCORE if value < 0 else 0
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        result.add_iteration(empty, col, score, self.solver.nodes, elapsed_ms)
+        result.solved = True
+        result.distance = EndgameSolver.distance(board, value)
+        self.stats.record_iteration(empty, self.solver.nodes, elapsed_ms)
+        if self.on_iteration is not None:
+            self.on_iteration(result.get_iterations()[-1])
+        return True
 
     def mini_max(self, node, alpha, beta, depth):
         """
@@ -33,88 +229,333 @@ class MiniMax:
         :param alpha: the alpha value
         :param beta: the beta value
         :param depth: the depth of the search.
-        :return: the node which represents the next best move to make.
+        :return: the MinBoardNode which represents the next best move to make, with the given node as
+            its parent, or None if no move can be made.
+        """
+        board = node.get_board().copy()  # The caller's board is never modified.
+        self.nodes = 0
+        self.current_depth = depth
+        self.orderer.new_search(board)
+        self.table.new_search()
+        self.root_moves = None
+        self.stats = SearchStats()
+        best_col, maximum = self.search_root(board, alpha, beta, depth)
+        if best_col is None:
+            return None
+        board.drop(self.ai, best_col)
+        return MinBoardNode(board, maximum, beta, node)  # The human moves next.
+
+    def search_root(self, board, alpha, beta, depth):
+        """
+        Search every move the AI can make from the given board.
+        :param board: the board to search, which is restored before returning.
+        :param alpha: the alpha value
+        :param beta: the beta value
+        :param depth: the depth of the search.
+        :return: the best column, or None if no move can be made, and its heuristic value.
         """
         # Depth is assumed to be > 0.
-        node_board = node.get_board()
+        self.start_iteration(board, depth)
+        entry = self.table.lookup(board.get_canonical_key())
+        if entry is not None:
+            self.stats.table_hits += 1
+        tt_col = self.table_col(board, entry)
+        original_alpha = alpha
         maximum = self.NEG_INF
-        best = None
-        for col in range(0, Board.get_length()):
-            if node_board.can_drop(col):
-                board_copy = copy.deepcopy(node_board)
-                board_copy.drop(self.ai, col)
-                min_node = BoardNode(board_copy, self.INF)
-                child = self.mini_max_min(min_node, alpha, beta, depth - 1)
-                ch = child.get_heuristic()
-                if ch > maximum:
-                    maximum = ch
-                    best = min_node
-                    alpha = max(alpha, ch)
-                    if beta <= alpha:
-                        break
-        return best
-
-    def mini_max_min(self, node, alpha, beta, depth):
+        best_col = None
+        order = self.orderer.order(board, self.ai, 0, tt_col)
+        if self.root_moves is not None:
+            order = [col for col in order if col in self.root_moves]
+        for index, col in enumerate(order):
+            board.drop(self.ai, col)
+            ch = self.search_max_child(board, alpha, beta, depth, index)
+            board.undo()
+            if ch > maximum:
+                maximum = ch
+                best_col = col
+                if alpha < ch < beta:
+                    self.pv[0] = (col,) + self.pv[1]
+                alpha = max(alpha, ch)
+                if beta <= alpha:
+                    self.record_cutoff(board, self.ai, 0, col, depth, index)
+                    break
+        if best_col is not None:
+            self.store(board, depth, maximum, original_alpha, beta, best_col)
+        self.last_pv = self.principal_variation(board, depth)
+        return best_col, maximum
+
+    def start_iteration(self, board, depth):
+        """
+        Get ready to search a board to a fixed depth.
+        :param board: the board at the root of the search.
+        :param depth: the depth of the search.
+        """
+        self.root_ply = len(board.moves)
+        self.stats.start_iteration(depth)
+        self.pv = [()] * (depth + 2)
+
+    def search_max_child(self, board, alpha, beta, depth, index):
+        """
+        Search the board after one of the AI's moves. With pvs set, every move after the first is
+        searched with a null window first.
+        :param board: the board after the move.
+        :param alpha: the alpha value of the node the move was made from.
+        :param beta: the beta value of the node the move was made from.
+        :param depth: the depth of the node the move was made from.
+        :param index: the position of the move in the order the moves are tried.
+        :return: the heuristic value of the board.
+        """
+        if index == 0 or not self.pvs:
+            return self.mini_max_min(board, alpha, beta, depth - 1)
+        ch = self.mini_max_min(board, alpha, alpha + self.NULL_WINDOW, depth - 1)
+        if alpha < ch < beta:  # Better than the moves so far, find its value.
+            self.stats.pvs_researches += 1
+            ch = self.mini_max_min(board, alpha, beta, depth - 1)
+        return ch
+
+    def search_min_child(self, board, alpha, beta, depth, index):
+        """
+        Search the board after one of the human's moves. With pvs set, every move after the first
+        is searched with a null window first.
+        :param board: the board after the move.
+        :param alpha: the alpha value of the node the move was made from.
+        :param beta: the beta value of the node the move was made from.
+        :param depth: the depth of the node the move was made from.
+        :param index: the position of the move in the order the moves are tried.
+        :return: the heuristic value of the board.
+        """
+        if index == 0 or not self.pvs:
+            return self.mini_max_max(board, alpha, beta, depth - 1)
+        ch = self.mini_max_max(board, beta - self.NULL_WINDOW, beta, depth - 1)
+        if alpha < ch < beta:  # Better for the human than the moves so far, find its value.
+            self.stats.pvs_researches += 1
+            ch = self.mini_max_max(board, alpha, beta, depth - 1)
+        return ch
+
+    def principal_variation(self, board, depth):
+        """
+        :param board: the board at the root of the search, which is restored before returning.
+        :param depth: the depth of the search.
+        :return: a list of the columns of the best line of play found, starting with the AI's
+            move. Where the line found while searching stops early at a position answered from the
+            transposition table, it is carried on with the table's best moves.
+        """
+        pv = list(self.pv[0])
+        pieces = (self.ai, self.human)
+        for ply, col in enumerate(pv):
+            board.drop(pieces[ply % 2], col)
+        while len(pv) < depth and board.winner_after_last_move() is None:
+            col = self.table_col(board, self.table.probe(board.get_canonical_key()))
+            if col is None or not board.drop(pieces[len(pv) % 2], col):
+                break
+            pv.append(col)
+        for col in pv:
+            board.undo()
+        return pv
+
+    def get_pv(self):
+        """
+        :return: a list of the columns of the best line of play found by the last search, starting
+            with the AI's move.
+        """
+        return self.last_pv
+
+    def mini_max_min(self, board, alpha, beta, depth):
         """
         MiniMax algorithm with alpha-beta pruning. Min Node Handling
-        :param node: the current Max or Min Board Node
+        :param board: the board to search, which is restored before returning.
         :param alpha: the alpha value
         :param beta: the beta value
         :param depth: the depth of the search.
-        :return: the node which represents the next best move to make for the human.
+        :return: the heuristic value of the best move for the human.
         """
-        if depth == 0 or node.get_board().find_winner() is not None:
-            node.set_heuristic(self.heuristic_finder.heuristic(node.get_board()))
-            return node
-        else:
-            # Depth is assumed to be > 0.
-            node_board = node.get_board()
-            minimum = self.INF
-            best = None
-            for col in range(0, Board.get_length()):
-                if node_board.can_drop(col):
-                    board_copy = copy.deepcopy(node_board)
-                    board_copy.drop(self.human, col)
-                    max_node = BoardNode(board_copy, self.NEG_INF)
-                    child = self.mini_max_max(max_node, alpha, beta, depth - 1)
-                    ch = child.get_heuristic()
-                    if ch < minimum:
-                        minimum = ch
-                        best = max_node
-                        best.set_heuristic(minimum)
-                        beta = min(beta, ch)
-                        if beta <= alpha:
-                            break
-            return best
-
-    def mini_max_max(self, node, alpha, beta, depth):
+        ply = len(board.moves) - self.root_ply
+        self.count_node(board, ply, depth)
+        self.pv[ply] = ()
+        stats = self.stats
+        stats.win_checks += 1
+        if depth == 0 or board.winner_after_last_move() is not None:
+            stats.leaf_evaluations += 1
+            return self.heuristic_finder.heuristic(board)
+        entry = self.table.lookup(board.get_canonical_key())
+        if entry is not None:
+            stats.table_hits += 1
+            if entry.depth >= depth:
+                if entry.flag == TranspositionTable.EXACT:
+                    stats.table_cutoffs += 1
+                    return entry.score
+                elif entry.flag == TranspositionTable.LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if beta <= alpha:
+                    stats.table_cutoffs += 1
+                    return entry.score
+        # Depth is assumed to be > 0.
+        original_alpha = alpha
+        original_beta = beta
+        minimum = self.INF
+        best_col = None
+        tt_col = self.table_col(board, entry)
+        for index, col in enumerate(self.orderer.order(board, self.human, ply, tt_col)):
+            board.drop(self.human, col)
+            ch = self.search_min_child(board, alpha, beta, depth, index)
+            board.undo()
+            if ch < minimum:
+                minimum = ch
+                best_col = col
+                if alpha < ch < beta:
+                    self.pv[ply] = (col,) + self.pv[ply + 1]
+                beta = min(beta, ch)
+                if beta <= alpha:
+                    self.record_cutoff(board, self.human, ply, col, depth, index)
+                    break
+        if best_col is None:  # No moves left, the board is filled.
+            stats.leaf_evaluations += 1
+            return self.heuristic_finder.heuristic(board)
+        self.store(board, depth, minimum, original_alpha, original_beta, best_col)
+        return minimum
+
+    def mini_max_max(self, board, alpha, beta, depth):
         """
         MiniMax algorithm with alpha-beta pruning. Max Node Hanlding
-        :param node: the current Max or Min Board Node
+        :param board: the board to search, which is restored before returning.
         :param alpha: the alpha value
         :param beta: the beta value
         :param depth: the depth of the search.
-        :return: the node which represents the next best move to make for the ai.
+        :return: the heuristic value of the best move for the ai.
+        """
+        ply = len(board.moves) - self.root_ply
+        self.count_node(board, ply, depth)
+        self.pv[ply] = ()
+        stats = self.stats
+        stats.win_checks += 1
+        if depth == 0 or board.winner_after_last_move() is not None:
+            stats.leaf_evaluations += 1
+            return self.heuristic_finder.heuristic(board)
+        entry = self.table.lookup(board.get_canonical_key())
+        if entry is not None:
+            stats.table_hits += 1
+            if entry.depth >= depth:
+                if entry.flag == TranspositionTable.EXACT:
+                    stats.table_cutoffs += 1
+                    return entry.score
+                elif entry.flag == TranspositionTable.LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if beta <= alpha:
+                    stats.table_cutoffs += 1
+                    return entry.score
+        original_alpha = alpha
+        original_beta = beta
+        maximum = self.NEG_INF
+        best_col = None
+        tt_col = self.table_col(board, entry)
+        for index, col in enumerate(self.orderer.order(board, self.ai, ply, tt_col)):
+            board.drop(self.ai, col)
+            ch = self.search_max_child(board, alpha, beta, depth, index)
+            board.undo()
+            if ch > maximum:
+                maximum = ch
+                best_col = col
+                if alpha < ch < beta:
+                    self.pv[ply] = (col,) + self.pv[ply + 1]
+                alpha = max(alpha, ch)
+                if beta <= alpha:
+                    self.record_cutoff(board, self.ai, ply, col, depth, index)
+                    break
+        if best_col is None:  # No moves left, the board is filled.
+            stats.leaf_evaluations += 1
+            return self.heuristic_finder.heuristic(board)
+        self.store(board, depth, maximum, original_alpha, original_beta, best_col)
+        return maximum
+
+    def count_node(self, board, ply, depth):
+        """
+        Count a searched node. Every TIME_CHECK_INTERVAL nodes, stop the search if it has been
+        cancelled or is out of time.
+        :param board: the board at the node.
+        :param ply: the number of moves made since the root.
+        :param depth: the depth left to search.
+        """
+        self.nodes += 1
+        self.stats.nodes_per_ply[ply] += 1
+        if self.on_node is not None:
+            self.on_node(board, ply, depth)
+        if not self.nodes & (self.TIME_CHECK_INTERVAL - 1):
+            if self.stop_requested or (self.deadline is not None and time.perf_counter() > self.deadline):
+                raise SearchTimeout()
+
+    def record_cutoff(self, board, piece, ply, col, depth, index):
         """
-        if depth == 0 or node.get_board().find_winner() is not None:
-            node.set_heuristic(self.heuristic_finder.heuristic(node.get_board()))
-            return node
+        Record a cutoff with the move orderer and the search stats.
+        :param board: the board the cutting move was made from.
+        :param piece: the piece of the player who made the move.
+        :param ply: the number of moves made since the root.
+        :param col: the column of the cutting move.
+        :param depth: the depth left to search at the node.
+        :param index: the position of the move in the order the moves were tried.
+        """
+        self.orderer.record_cutoff(piece, ply, col, depth, index)
+        self.stats.record_cutoff(index)
+        if self.on_cutoff is not None:
+            self.on_cutoff(board, ply, col, index)
+
+    def cancel(self):
+        """
+        Stop a running search from another thread. An iterative deepening search returns the best
+        move found so far, and mini_max raises SearchTimeout.
+        """
+        self.stop_requested = True
+        self.solver.cancel()
+
+    def reset_cancel(self):
+        """
+        Clear an earlier cancel(), so the next search runs. Searches never clear it themselves, so
+        call this before starting a search that may be cancelled, on the thread that cancels it.
+        """
+        self.stop_requested = False
+        self.solver.reset_cancel()
+
+    def get_progress(self):
+        """
+        :return: the depth of the iteration being searched and the number of nodes it has searched.
+            While the endgame solver runs, the depth is the number of blank cells.
+        """
+        if self.solving:
+            return self.current_depth, self.solver.nodes
+        return self.current_depth, self.nodes
+
+    def store(self, board, depth, score, alpha, beta, best_col):
+        """
+        Store a searched position in the transposition table.
+        :param board: the searched board.
+        :param depth: the depth the board was searched to.
+        :param score: the score found by the search.
+        :param alpha: the alpha value the search started with.
+        :param beta: the beta value the search started with.
+        :param best_col: the best column found.
+        """
+        if score <= alpha:
+            flag = TranspositionTable.UPPER_BOUND
+        elif score >= beta:
+            flag = TranspositionTable.LOWER_BOUND
         else:
-            node_board = node.get_board()
-            maximum = self.NEG_INF
-            best = None
-            for col in range(0, Board.get_length()):
-                if node_board.can_drop(col):
-                    board_copy = copy.deepcopy(node_board)
-                    board_copy.drop(self.ai, col)
-                    min_node = BoardNode(board_copy, self.INF)
-                    child = self.mini_max_min(min_node, alpha, beta, depth - 1)
-                    ch = child.get_heuristic()
-                    if ch > maximum:
-                        maximum = ch
-                        best = min_node
-                        best.set_heuristic(maximum)
-                        alpha = max(alpha, ch)
-                        if beta <= alpha:
-                            break
-            return best
+            flag = TranspositionTable.EXACT
+        if board.is_mirrored():  # Columns are stored for the canonical board.
+            best_col = board.mirror_col(best_col)
+        self.table.store(board.get_canonical_key(), depth, score, flag, best_col)
+
+    @staticmethod
+    def table_col(board, entry):
+        """
+        :param board: the board the entry was looked up for.
+        :param entry: the TableEntry found for the board, or None.
+        :return: the entry's best column on the given board, or None if there is no entry.
+        """
+        if entry is None or entry.best_col is None:
+            return None
+        if board.is_mirrored():
+            return board.mirror_col(entry.best_col)
+        return entry.best_col
@@ -0,0 +1,135 @@
+from src.board import Board
+
+__author__ = 'Bill'
+
+
+class MoveOrderer:
+    """
+    Decides the order the search tries columns in. Alpha-beta pruning cuts off the
+    most when the best move is tried first, so moves are tried in this order:
+        1. The best move stored in the transposition table, which is the previous
+           iteration's best move at the root.
+        2. Killer moves, recent moves that caused a cutoff at the same ply.
+        3. The remaining moves by history score, how much they have caused cutoffs
+           anywhere in the search, with ties broken center column first.
+    Each part can be turned off. With all of them off the columns are tried left to right.
+    """
+
+    # Class Constants
+    KILLERS_PER_PLY = 2  # Killer moves remembered at each ply.
+    MAX_HISTORY = 1 << 20  # History scores are halved once one reaches this value.
+
+    def __init__(self, center_first=True, tt_move=True, killers=True, history=True):
+        """
+        Create a move orderer.
+        :param center_first: try columns from the center outward instead of left to right.
+        :param tt_move: try the transposition table's best move first.
+        :param killers: try killer moves next.
+        :param history: sort the remaining moves by history score.
+        """
+        self.center_first = center_first
+        self.tt_move = tt_move
+        self.killers = killers
+        self.history = history
+        self.base_order = []  # Every column, in the order tried before killers and history.
+        self.killer_moves = []  # Killer moves for each ply, newest first.
+        self.history_scores = {}
+        self.set_geometry(Board)
+        self.cutoffs = 0  # Nodes where the search cut off.
+        self.first_move_cutoffs = 0  # Nodes where the first move tried caused the cutoff.
+        self.cutoff_move_index_total = 0  # Sum of the indexes of the moves that caused cutoffs.
+
+    def set_geometry(self, board):
+        """
+        Size the orderer for boards of a geometry, forgetting the killer moves and history scores.
+        :param board: a board of the geometry, or its Board class.
+        """
+        length = board.get_length()
+        if self.center_first:
+            self.base_order = list(board.CENTER_ORDER)
+        else:
+            self.base_order = list(range(0, length))
+        self.killer_moves = []
+        self.history_scores = {Board.PLAYER_ONE: [0] * length, Board.PLAYER_TWO: [0] * length}
+
+    def new_search(self, board=None):
+        """
+        Forget the killer moves and age the history scores before a new search.
+        :param board: the board at the root of the search, or None for the same geometry as the last one.
+        """
+        if board is not None and board.get_length() != len(self.base_order):
+            self.set_geometry(board)
+        self.killer_moves = []
+        for scores in self.history_scores.values():
+            for col in range(0, len(scores)):
+                scores[col] //= 2
+
+    def order(self, board, piece, ply, tt_col=None):
+        """
+        :param board: the board being searched.
+        :param piece: the piece of the player to move.
+        :param ply: the number of moves made since the root of the search.
+        :param tt_col: the transposition table's best column for the board, or None.
+        :return: the columns a piece can be dropped into, in the order to try them.
+        """
+        moves = board.legal_moves(self.base_order)
+        if self.history:
+            scores = self.history_scores[piece]
+            moves.sort(key=lambda col: -scores[col])
+        if self.killers and ply < len(self.killer_moves):
+            for killer in reversed(self.killer_moves[ply]):
+                if killer in moves:
+                    moves.remove(killer)
+                    moves.insert(0, killer)
+        if self.tt_move and tt_col is not None and tt_col in moves:
+            moves.remove(tt_col)
+            moves.insert(0, tt_col)
+        return moves
+
+    def record_cutoff(self, piece, ply, col, depth, move_index):
+        """
+        Record a move that caused a cutoff.
+        :param piece: the piece of the player who made the move.
+        :param ply: the number of moves made since the root of the search.
+        :param col: the column of the move.
+        :param depth: the depth left to search below the move's node.
+        :param move_index: the position of the move in the order it was tried.
+        """
+        self.cutoffs += 1
+        self.cutoff_move_index_total += move_index
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        if self.killers:
+            while len(self.killer_moves) <= ply:
+                self.killer_moves.append([])
+            killers = self.killer_moves[ply]
+            if col in killers:
+                killers.remove(col)
+            killers.insert(0, col)
+            del killers[self.KILLERS_PER_PLY:]
+        if self.history:
+            scores = self.history_scores[piece]
+            scores[col] += depth * depth
+            if scores[col] >= self.MAX_HISTORY:
+                for other in range(0, len(scores)):
+                    scores[other] //= 2
+
+    def get_stats(self):
+        """
+        :return: a dictionary of cutoff counters. first_move_cutoff_rate is the share of cutoffs
+            caused by the first move tried, which is 1.0 with perfect ordering.
+        """
+        return {
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            "average_cutoff_move_index": self.cutoff_move_index_total / self.cutoffs if self.cutoffs else 0.0,
+        }
+
+    def reset_stats(self):
+        """
+        Reset the cutoff counters.
+        """
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoff_move_index_total = 0
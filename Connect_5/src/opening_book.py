@@ -0,0 +1,299 @@
+from src.board import Board
+from src.minimax import MiniMax
+import argparse
+import concurrent.futures
+import mmap
+import os
+import struct
+import sys
+import time
+
+__author__ = 'Bill'
+
+
+class OpeningBook:
+    """
+    Best moves for early positions, searched ahead of time by OpeningBookBuilder and
+    read from a file through mmap. Nothing is read when the book is opened, so it adds
+    nothing to startup, and a lookup is a binary search over the file's sorted records.
+
+    The file starts with a header, followed by a record for every position sorted by
+    key. A position's key is its canonical key combined with the key of the player to
+    move, so a position and its mirror image share a record, while positions with
+    either player to move are kept apart. Columns are stored for the canonical board.
+    """
+
+    # Class Constants
+    MAGIC = b"C5BK"  # First bytes of every book file.
+    VERSION = 2
+    HEADER = struct.Struct("<4sHBBBxI")  # Magic, version, width, height, score to win, record count.
+    RECORD = struct.Struct("<QBBf")  # Key, best column, search depth, score.
+    KEY = struct.Struct("<Q")  # The key at the start of each record.
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "opening_book.bin")
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Open a book file.
+        :param path: the path of the book file.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file cannot be mapped.
+            self.file.close()
+            raise ValueError("Not an opening book: " + path)
+        if len(self.data) < self.HEADER.size:
+            self.close()
+            raise ValueError("Not an opening book: " + path)
+        magic, version, width, height, score_to_win, count = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError("Not an opening book, or an unsupported version: " + path)
+        if len(self.data) < self.HEADER.size + count * self.RECORD.size:
+            self.close()
+            raise ValueError("Opening book is truncated: " + path)
+        self.count = count
+        self.geometry = (width, height, score_to_win)  # The board geometry the book was built for.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def open_default():
+        """
+        :return: the book at DEFAULT_PATH, or None if it has not been built or can't be read, for
+            example because it was built by an older version.
+        """
+        if not os.path.exists(OpeningBook.DEFAULT_PATH):
+            return None
+        try:
+            return OpeningBook(OpeningBook.DEFAULT_PATH)
+        except (ValueError, OSError) as error:
+            sys.stderr.write(str(error) + "\nThe opening book will not be used, build it again to use it.\n")
+            return None
+
+    @staticmethod
+    def position_key(board, piece):
+        """
+        :param board: the board.
+        :param piece: the piece of the player to move.
+        :return: the book key of the position.
+        """
+        return board.get_canonical_key() ^ board.ZOBRIST.to_move_key(piece)
+
+    def close(self):
+        """
+        Close the book file.
+        """
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def lookup(self, key):
+        """
+        :param key: the book key of a position.
+        :return: the best column, the depth it was searched to and its score, or None if the
+            position is not in the book.
+        """
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            found = self.KEY.unpack_from(self.data, self.HEADER.size + middle * self.RECORD.size)[0]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                key, col, depth, score = self.RECORD.unpack_from(self.data, self.HEADER.size + middle * self.RECORD.size)
+                return col, depth, score
+        return None
+
+    def probe(self, board, piece):
+        """
+        :param board: the board.
+        :param piece: the piece of the player to move.
+        :return: the best column, the depth it was searched to and its score, or None if the
+            position is not in the book or the board is not the geometry the book was built for.
+        """
+        if board.get_geometry() != self.geometry:
+            return None
+        found = self.lookup(self.position_key(board, piece))
+        if found is None:
+            return None
+        col, depth, score = found
+        if board.is_mirrored():
+            col = board.mirror_col(col)
+        if not board.is_legal(col):  # A legal move guards against key collisions.
+            return None
+        return col, depth, score
+
+
+class OpeningBookBuilder:
+    """
+    Searches every position up to a number of plies from the empty board and writes the
+    best moves to an opening book file. A position and its mirror image, where every
+    column is reflected, share a key, so only one of them is searched. Every position
+    is also added with the colors swapped, so the book answers for either color moving
+    first.
+    Searches are spread over a process pool.
+    """
+
+    DEFAULT_PLIES = 4  # Positions with up to this many pieces are searched.
+    DEFAULT_DEPTH = 8  # Depth each position is searched to, deeper than the game searches.
+
+    def __init__(self, plies=DEFAULT_PLIES, depth=DEFAULT_DEPTH, workers=None):
+        """
+        Set up the builder.
+        :param plies: the most pieces a position in the book has.
+        :param depth: the depth each position is searched to.
+        :param workers: the number of worker processes, or None for one per CPU core.
+        """
+        self.plies = plies
+        self.depth = depth
+        self.workers = workers
+
+    @staticmethod
+    def replay(moves, swap_colors=False):
+        """
+        :param moves: (piece, column) pairs played from an empty board.
+        :param swap_colors: swap every piece for the other player's.
+        :return: the board after the moves.
+        """
+        board = Board()
+        for piece, col in moves:
+            board.drop(Board.OPPONENT[piece] if swap_colors else piece, col)
+        return board
+
+    def positions(self):
+        """
+        :return: a list of (piece to move, moves) for one of each mirror pair of positions with
+            up to plies pieces, red moving first, where moves are (piece, column) pairs played
+            from an empty board. Won and filled positions are left out.
+        """
+        positions = []
+        seen = set()
+        frontier = [[]]
+        for ply in range(0, self.plies + 1):
+            piece = Board.PLAYER_ONE if ply % 2 == 0 else Board.PLAYER_TWO
+            next_frontier = []
+            for moves in frontier:
+                board = self.replay(moves)
+                if board.get_canonical_key() in seen:
+                    continue
+                seen.add(board.get_canonical_key())
+                if board.find_winner() is not None or board.is_filled():
+                    continue
+                positions.append((piece, moves))
+                for col in board.legal_moves():
+                    next_frontier.append(moves + [(piece, col)])
+            frontier = next_frontier
+        return positions
+
+    @staticmethod
+    def search_position(piece, moves, depth):
+        """
+        Search a single position. Runs in a worker process.
+        :param piece: the piece of the player to move.
+        :param moves: the (piece, column) pairs played from an empty board.
+        :param depth: the depth to search to.
+        :return: the position's piece and moves, with its best column and score.
+        """
+        board = OpeningBookBuilder.replay(moves)
+        minimax = MiniMax(Board.OPPONENT[piece], piece)
+        result = minimax.search(board, MiniMax.INF, depth)
+        return piece, moves, result.get_best_col(), result.get_score()
+
+    def records(self, searched):
+        """
+        :param searched: a list of (piece, moves, best column, score) from search_position.
+        :return: a dictionary of (best column, depth, score) keyed by book key, for every
+            position and its color swapped form, with columns for the canonical board.
+        """
+        records = {}
+        for piece, moves, col, score in searched:
+            if col is None:
+                continue
+            for swap_colors in (False, True):
+                board = self.replay(moves, swap_colors)
+                to_move = Board.OPPONENT[piece] if swap_colors else piece
+                records[OpeningBook.position_key(board, to_move)] = (
+                    Board.mirror_col(col) if board.is_mirrored() else col, self.depth, score)
+        return records
+
+    @staticmethod
+    def write(records, path):
+        """
+        Write records to a book file. The book is written to a temporary file first, which then
+        replaces the old book, so a game reading the old book through mmap never sees it change.
+        :param records: a dictionary of (best column, depth, score) keyed by book key.
+        :param path: the path of the book file.
+        """
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as out:
+                out.write(OpeningBook.HEADER.pack(OpeningBook.MAGIC, OpeningBook.VERSION, Board.get_length(),
+                                                  Board.get_height(), Board.SCORE_TO_WIN, len(records)))
+                for key in sorted(records):
+                    col, depth, score = records[key]
+                    out.write(OpeningBook.RECORD.pack(key, col, depth, score))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def build(self, path=OpeningBook.DEFAULT_PATH, progress=None):
+        """
+        Search every position and write the book.
+        :param path: the path of the book file.
+        :param progress: a writable text file for progress reports, or None.
+        :return: the number of records written.
+        """
+        positions = self.positions()
+        searched = []
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(OpeningBookBuilder.search_position, piece, moves, self.depth)
+                       for piece, moves in positions]
+            for future in concurrent.futures.as_completed(futures):
+                searched.append(future.result())
+                if progress is not None:
+                    progress.write("\r{0}/{1} positions, {2:.0f} s".format(len(searched), len(positions),
+                                                                           time.perf_counter() - start))
+                    progress.flush()
+        if progress is not None:
+            progress.write("\n")
+        records = self.records(searched)
+        self.write(records, path)
+        return len(records)
+
+    @staticmethod
+    def main(argv=None):
+        """
+        Build a book from the command line.
+        :param argv: the command line arguments, or None for sys.argv.
+        """
+        parser = argparse.ArgumentParser(description="Build the Connect 5 opening book.")
+        parser.add_argument("--plies", type=int, default=OpeningBookBuilder.DEFAULT_PLIES,
+                            help="most pieces a position in the book has")
+        parser.add_argument("--depth", type=int, default=OpeningBookBuilder.DEFAULT_DEPTH,
+                            help="depth each position is searched to")
+        parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per core")
+        parser.add_argument("--out", default=OpeningBook.DEFAULT_PATH, help="book file to write")
+        args = parser.parse_args(argv)
+
+        count = OpeningBookBuilder(args.plies, args.depth, args.workers).build(args.out, sys.stderr)
+        sys.stderr.write(str(count) + " positions written to " + args.out + "\n")
+
+
+if __name__ == "__main__":
+    OpeningBookBuilder.main()
@@ -0,0 +1,230 @@
+from src.board import Board
+from src.board_node import BoardNode
+from src.minimax import MiniMax
+from src.move_ordering import MoveOrderer
+from src.search_result import SearchResult
+from src.search_timeout import SearchTimeout
+import concurrent.futures
+import os
+import time
+
+__author__ = 'Bill'
+
+
+class ParallelMiniMax:
+    """
+    Runs the MiniMax search for the AI's move on several processes at once. The first
+    move, in the order a fresh serial search tries them, is searched on its own with a
+    full window, which gives alpha, the value every other move has to beat. The other
+    moves are then searched at the same time, each in its own task on a process pool,
+    with a null window at alpha, which only asks whether the move is better and prunes
+    as much as the serial search does. A move that is better is searched again in the
+    same task with a window from alpha up to find its value. The best move is the first
+    one with the highest value in the serial order, so the result is the same move
+    MiniMax.mini_max finds at the same depth.
+    """
+
+    # Class Constants
+    WAIT_INTERVAL_S = 0.05  # Time between checks for cancel() while waiting for the workers.
+
+    def __init__(self, p1, p2, workers=None):
+        """
+        Set up the parallel search.
+        :param p1: the piece value for the human player.
+        :param p2: the piece value for the ai.
+        :param workers: the number of worker processes, or None for one per CPU core.
+        """
+        self.human = p1
+        self.ai = p2
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.executor = None  # Started on the first search.
+        self.minimax = None  # The MiniMax searching the first move, while it is searched.
+        self.stop_requested = False  # Set by cancel() to stop a running search.
+        self.depth = 0  # Depth of the search running, or of the last one.
+        self.nodes = 0  # Nodes searched by the moves finished so far in that search.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def start(self):
+        """
+        Start the worker processes, if they are not already running.
+        """
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            # Make sure every worker has started and imported the engine before timing anything.
+            list(self.executor.map(ParallelMiniMax.warm_up, range(0, self.workers)))
+
+    @staticmethod
+    def warm_up(worker):
+        """
+        A task that does nothing, used to start the worker processes.
+        :param worker: the worker number.
+        :return: the worker number.
+        """
+        return worker
+
+    @staticmethod
+    def search_move(human, ai, geometry, moves, col, depth, alpha=None, minimax=None):
+        """
+        Search a single move for the AI. Runs in a worker process, except for the first move.
+        :param human: the piece value for the human player.
+        :param ai: the piece value for the ai.
+        :param geometry: the board's (width, height, win length).
+        :param moves: the (piece, column) pairs of every move made so far, oldest first.
+        :param col: the column the AI drops into.
+        :param depth: the depth of the whole search, including the AI's move.
+        :param alpha: the value the move has to beat, or None to find its value with a full window.
+        :param minimax: the MiniMax to search with, or None for a new one.
+        :return: the column, its heuristic value and the number of nodes searched. The value is
+            exact if it is above alpha and otherwise only known to be at most alpha.
+        """
+        board = Board(*geometry)
+        for piece, move in moves:
+            board.drop(piece, move)
+        if minimax is None:
+            minimax = MiniMax(human, ai)
+        minimax.orderer.new_search(board)
+        minimax.start_iteration(board, depth)
+        board.drop(ai, col)
+        if alpha is None:
+            score = minimax.mini_max_min(board, MiniMax.NEG_INF, MiniMax.INF, depth - 1)
+        else:
+            score = minimax.mini_max_min(board, alpha, alpha + MiniMax.NULL_WINDOW, depth - 1)
+            if score > alpha:  # Better than the first move, find its value.
+                score = minimax.mini_max_min(board, alpha, MiniMax.INF, depth - 1)
+        return col, score, minimax.nodes
+
+    def cancel(self):
+        """
+        Stop a running search from another thread, which then raises SearchTimeout. Moves already
+        being searched by the workers run to the end, but their results are not waited for.
+        """
+        self.stop_requested = True
+        minimax = self.minimax
+        if minimax is not None:
+            minimax.cancel()
+
+    def get_progress(self):
+        """
+        :return: the depth of the search and the number of nodes searched so far, counting the first
+            move as it is searched and the other moves as they finish.
+        """
+        minimax = self.minimax
+        return self.depth, self.nodes + (minimax.nodes if minimax is not None else 0)
+
+    def reset_cancel(self):
+        """
+        Clear an earlier cancel(), so the next search runs. Searches never clear it themselves, so
+        call this before starting a search that may be cancelled, on the thread that cancels it.
+        """
+        self.stop_requested = False
+
+    def wait(self, future):
+        """
+        :param future: the future of a search_move task.
+        :return: the task's result.
+        """
+        while True:
+            try:
+                return future.result(timeout=self.WAIT_INTERVAL_S)
+            except concurrent.futures.TimeoutError:
+                if self.stop_requested:
+                    raise SearchTimeout()
+
+    def search(self, board, depth):
+        """
+        Search for the AI's best move to a fixed depth.
+        :param board: the board to move on, which is not modified.
+        :param depth: the depth of the search, at least 1.
+        :return: a SearchResult with a single iteration.
+        """
+        self.start()
+        self.depth = depth
+        self.nodes = 0
+        start = time.perf_counter()
+        result = SearchResult()
+        orderer = MoveOrderer()
+        orderer.new_search(board)
+        order = orderer.order(board, self.ai, 0)  # The order a fresh serial search uses.
+        if not order:
+            return result
+        moves = board.get_moves()
+        geometry = board.get_geometry()
+
+        # The first move's value is the alpha every other move is searched against.
+        self.minimax = MiniMax(self.human, self.ai)
+        if self.stop_requested:  # Cancelled before the MiniMax was there to pass it on to.
+            self.minimax = None
+            raise SearchTimeout()
+        try:
+            col, alpha, self.nodes = ParallelMiniMax.search_move(self.human, self.ai, geometry, moves, order[0],
+                                                                 depth, minimax=self.minimax)
+        finally:
+            self.minimax = None
+        scores = {col: alpha}
+        futures = [self.executor.submit(ParallelMiniMax.search_move, self.human, self.ai, geometry, moves, col,
+                                        depth, alpha)
+                   for col in order[1:]]
+        try:
+            for future in futures:
+                col, score, move_nodes = self.wait(future)
+                scores[col] = score
+                self.nodes += move_nodes
+        except SearchTimeout:
+            for future in futures:
+                future.cancel()
+            raise
+        best_col = None
+        for col in order:
+            if best_col is None or scores[col] > scores[best_col]:
+                best_col = col
+        result.add_iteration(depth, best_col, scores.get(best_col), self.nodes,
+                             (time.perf_counter() - start) * 1000.0)
+        return result
+
+    def measure_speedup(self, board, depth, worker_counts=None):
+        """
+        Time the search against a serial MiniMax search for several numbers of workers.
+        :param board: the board to move on.
+        :param depth: the depth of the search.
+        :param worker_counts: the numbers of workers to try, or None for 1, 2, 4, ... up to the
+            number of CPU cores.
+        :return: a list with a dictionary of workers, time_ms, speedup, best_col and
+            matches_serial for each number of workers, after one for the serial search with 0 workers.
+        """
+        if worker_counts is None:
+            worker_counts = []
+            count = 1
+            while count < (os.cpu_count() or 1):
+                worker_counts.append(count)
+                count *= 2
+            worker_counts.append(os.cpu_count() or 1)
+
+        start = time.perf_counter()
+        serial_node = MiniMax(self.human, self.ai).mini_max(BoardNode(board, MiniMax.NEG_INF),
+                                                             MiniMax.NEG_INF, MiniMax.INF, depth)
+        serial_ms = (time.perf_counter() - start) * 1000.0
+        serial_col = serial_node.get_board().get_last_move()[1] if serial_node is not None else None
+        report = [{"workers": 0, "time_ms": serial_ms, "speedup": 1.0, "best_col": serial_col,
+                   "matches_serial": True}]
+
+        for workers in worker_counts:
+            with ParallelMiniMax(self.human, self.ai, workers) as parallel:
+                parallel.start()
+                result = parallel.search(board, depth)
+            time_ms = result.get_iterations()[-1]["time_ms"]
+            report.append({"workers": workers, "time_ms": time_ms, "speedup": serial_ms / time_ms,
+                           "best_col": result.get_best_col(), "matches_serial": result.get_best_col() == serial_col})
+        return report
@@ -0,0 +1,88 @@
+__author__ = 'Bill'
+
+
+class SearchResult:
+    """
+    The outcome of an iterative deepening search: the best move from the deepest
+    completed iteration, plus a report of every iteration that was run.
+    """
+
+    def __init__(self):
+        """
+        Create an empty result. Iterations are added as they complete.
+        """
+        self.best_col = None
+        self.score = None
+        self.depth = 0  # Deepest completed iteration.
+        self.nodes = 0  # Nodes searched over every iteration, including an unfinished one.
+        self.timed_out = False
+        self.from_book = False  # The move came from the opening book instead of a search.
+        self.solved = False  # The position was solved exactly by the endgame solver.
+        self.distance = None  # Moves until a solved game is won or lost, or None.
+        self.threat = None  # The ThreatFinder reason for the move if it was not searched, or None.
+        self.iterations = []
+        self.pv = []  # Columns of the principal variation of the deepest completed iteration.
+        self.stats = None  # The SearchStats of the search, set by the search.
+
+    def add_iteration(self, depth, best_col, score, nodes, time_ms, pv=None):
+        """
+        Record a completed iteration, which becomes the result's best move.
+        :param depth: the depth of the iteration.
+        :param best_col: the best column found.
+        :param score: the score of the best column.
+        :param nodes: the number of nodes searched.
+        :param time_ms: the time the iteration took in milliseconds.
+        :param pv: the columns of the principal variation, or None for just the best column.
+        """
+        if pv is None:
+            pv = [best_col] if best_col is not None else []
+        self.best_col = best_col
+        self.score = score
+        self.depth = depth
+        self.nodes += nodes
+        self.pv = list(pv)
+        self.iterations.append({
+            "depth": depth,
+            "best_col": best_col,
+            "score": score,
+            "nodes": nodes,
+            "time_ms": time_ms,
+            "pv": self.pv,
+        })
+
+    def get_best_col(self):
+        """
+        :return: the best column to drop a piece into, or None if no move can be made.
+        """
+        return self.best_col
+
+    def get_score(self):
+        """
+        :return: the score of the best column.
+        """
+        return self.score
+
+    def get_depth(self):
+        """
+        :return: the depth of the deepest completed iteration.
+        """
+        return self.depth
+
+    def get_pv(self):
+        """
+        :return: a list of the columns of the best line of play, starting with the best column.
+        """
+        return self.pv
+
+    def get_stats(self):
+        """
+        :return: the SearchStats with the counts of the whole search, or None if it was not kept.
+        """
+        return self.stats
+
+    def get_iterations(self):
+        """
+        :return: a list with a dictionary of depth, best_col, score, nodes, time_ms and pv for
+            each completed iteration.
+        """
+        return self.iterations
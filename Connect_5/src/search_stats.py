@@ -0,0 +1,79 @@
+__author__ = 'Bill'
+
+
+class SearchStats:
+    """
+    Counts of what a MiniMax search did, filled in while it runs. Nodes are counted by
+    ply from the root, and cutoffs by the index of the move that caused them, so a slow
+    search on a particular position can be traced to the plies and move orders that
+    made it slow. The counts cover every iteration since the search started.
+    """
+
+    def __init__(self):
+        """
+        Create an empty set of counts.
+        """
+        self.nodes_per_ply = []  # Nodes searched at each ply from the root, the root's children are ply 1.
+        self.leaf_evaluations = 0  # Calls to the heuristic.
+        self.win_checks = 0  # Calls to Board.winner_after_last_move.
+        self.cutoffs = 0  # Beta cutoffs, including alpha cutoffs at min nodes.
+        self.cutoff_move_indexes = []  # Cutoffs caused by the n-th move tried at a node, indexed by n.
+        self.table_hits = 0  # Transposition table lookups that found the position.
+        self.table_cutoffs = 0  # Nodes answered from the table without being searched.
+        self.pvs_researches = 0  # Moves searched again after beating a null window.
+        self.aspiration_researches = 0  # Iterations searched again after missing their aspiration window.
+        self.depth_times_ms = {}  # Time each completed iteration took in milliseconds, keyed by depth.
+        self.depth_nodes = {}  # Nodes each completed iteration searched, keyed by depth.
+
+    def start_iteration(self, depth):
+        """
+        Make room for the nodes of an iteration to the given depth.
+        :param depth: the depth of the iteration.
+        """
+        while len(self.nodes_per_ply) <= depth:
+            self.nodes_per_ply.append(0)
+
+    def record_cutoff(self, index):
+        """
+        Count a cutoff.
+        :param index: the position of the cutting move in the order its moves were tried.
+        """
+        self.cutoffs += 1
+        while len(self.cutoff_move_indexes) <= index:
+            self.cutoff_move_indexes.append(0)
+        self.cutoff_move_indexes[index] += 1
+
+    def record_iteration(self, depth, nodes, time_ms):
+        """
+        Record a completed iteration.
+        :param depth: the depth of the iteration.
+        :param nodes: the number of nodes it searched.
+        :param time_ms: the time it took in milliseconds.
+        """
+        self.depth_times_ms[depth] = time_ms
+        self.depth_nodes[depth] = nodes
+
+    def get_nodes(self):
+        """
+        :return: the number of nodes searched at every ply.
+        """
+        return sum(self.nodes_per_ply)
+
+    def get_stats(self):
+        """
+        :return: a dictionary of every count.
+        """
+        return {
+            "nodes": self.get_nodes(),
+            "nodes_per_ply": list(self.nodes_per_ply),
+            "leaf_evaluations": self.leaf_evaluations,
+            "win_checks": self.win_checks,
+            "cutoffs": self.cutoffs,
+            "cutoff_move_indexes": list(self.cutoff_move_indexes),
+            "table_hits": self.table_hits,
+            "table_cutoffs": self.table_cutoffs,
+            "pvs_researches": self.pvs_researches,
+            "aspiration_researches": self.aspiration_researches,
+            "depth_times_ms": dict(self.depth_times_ms),
+            "depth_nodes": dict(self.depth_nodes),
+        }
@@ -0,0 +1,8 @@
+__author__ = 'Bill'
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out or it is cancelled.
+    """
+    pass
@@ -0,0 +1,93 @@
+from src.board import Board
+
+__author__ = 'Bill'
+
+
+class ThreatFinder:
+    """
+    Looks for tactics that decide the AI's move without a search: a win with the next
+    piece, a win the human has to be stopped from making, and a move that makes two
+    threats at once, which the human cannot both stop. Threats in every direction count,
+    including vertical ones, and so do threats with a gap in the middle of the line.
+    When nothing decides the move, the moves that let the human win straight away are
+    left out of the search.
+    """
+
+    # Reasons
+    WIN = "win"  # The AI wins with this move.
+    BLOCK = "block"  # The human would win here with their next move.
+    DOUBLE_THREAT = "double_threat"  # The move makes two threats, and the human can only stop one.
+    ONLY_MOVE = "only_move"  # Every other move lets the human win straight away.
+
+    def __init__(self, human_player, ai_player):
+        """
+        Create a ThreatFinder object.
+        :param human_player: the piece value for the human player
+        :param ai_player: the piece value for the ai player
+        """
+        self.ai_player = ai_player
+        self.human_player = human_player
+
+    @staticmethod
+    def column_mask(board, col):
+        """
+        :param board: a board of the geometry to use.
+        :param col: the column number.
+        :return: the bitboard of every cell in the column.
+        """
+        return ((1 << board.BOARD_HEIGHT) - 1) << (col * board.COLUMN_BITS)
+
+    def safe_moves(self, board):
+        """
+        :param board: the board.
+        :return: the columns the AI can drop into without making a cell the human wins with
+            playable, that is without dropping right below one.
+        """
+        human_wins = board.winning_cells(self.human_player)
+        return board.cell_columns(board.playable_cells() & ~(human_wins >> Board.VERTICAL))
+
+    def makes_double_threat(self, board, col):
+        """
+        :param board: the board, which is restored before returning. Neither player can win with
+            their next piece on it.
+        :param col: the column the AI drops into.
+        :return: true if after the move the AI has two cells to win with next that the human
+            cannot both block, either side by side or one right above the other, and the human
+            cannot win first.
+        """
+        board.drop(self.ai_player, col)
+        playable = board.playable_cells()
+        if board.winning_cells(self.human_player) & playable:
+            board.undo()
+            return False
+        ai_wins = board.winning_cells(self.ai_player)
+        threats = ai_wins & playable
+        board.undo()
+        if threats & (threats - 1):  # Two playable wins.
+            return True
+        return bool(threats & (ai_wins >> Board.VERTICAL))  # A win the human's block makes playable.
+
+    def check(self, board):
+        """
+        Look for a move that decides the game or is forced.
+        :param board: the board, which is restored before returning. The last move on it must
+            not have won the game.
+        :return: a column and the reason for it if the move is decided, otherwise None and a list
+            of the columns worth searching.
+        """
+        playable = board.playable_cells()
+        wins = board.winning_cells(self.ai_player) & playable
+        if wins:
+            return board.cell_columns(wins)[0], self.WIN
+        blocks = board.winning_cells(self.human_player) & playable
+        if blocks:  # With more than one block the game is lost anyway.
+            return board.cell_columns(blocks)[0], self.BLOCK
+        moves = self.safe_moves(board)
+        if not moves:  # Every move loses, so every move is worth searching.
+            return None, board.cell_columns(playable)
+        for col in moves:
+            if self.makes_double_threat(board, col):
+                return col, self.DOUBLE_THREAT
+        if len(moves) == 1:
+            return moves[0], self.ONLY_MOVE
+        return None, moves
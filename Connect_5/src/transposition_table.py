@@ -0,0 +1,147 @@
+__author__ = 'Bill'
+
+
+class TableEntry:
+    """
+    A searched position stored in a TranspositionTable. Entries use __slots__, since a
+    table holds a great many of them.
+    """
+
+    __slots__ = ("key", "depth", "score", "flag", "best_col", "generation")
+
+    def __init__(self, key, depth, score, flag, best_col, generation=0):
+        """
+        Create a table entry.
+        :param key: the position's hash key.
+        :param depth: the depth the position was searched to.
+        :param score: the score found by the search.
+        :param flag: whether the score is exact, a lower bound or an upper bound.
+        :param best_col: the best column found, or None.
+        :param generation: the table's generation when the entry was stored.
+        """
+        self.key = key
+        self.depth = depth
+        self.score = score
+        self.flag = flag
+        self.best_col = best_col
+        self.generation = generation
+
+
+class TranspositionTable:
+    """
+    A fixed size table of searched positions, indexed by Zobrist hash keys. Each key maps
+    to a single slot, so when two positions share a slot the replacement policy decides
+    which one is kept.
+
+    The table is kept from search to search, and each search starts a new generation with
+    new_search(). Entries from an older generation are always replaced, so deep entries
+    for positions the game has moved past can't keep out the current search's entries.
+    """
+
+    # Bound Types
+    EXACT = 0  # The score is the position's value.
+    LOWER_BOUND = 1  # The search failed high, the value is at least the score.
+    UPPER_BOUND = 2  # The search failed low, the value is at most the score.
+
+    # Replacement Policies
+    REPLACE_ALWAYS = "always"  # The newest entry always takes the slot.
+    REPLACE_DEPTH = "depth"  # Keep the deeper entry of this generation unless the slot holds the same position.
+
+    DEFAULT_SIZE = 1 << 16  # Number of slots.
+
+    def __init__(self, size=DEFAULT_SIZE, replacement=REPLACE_DEPTH):
+        """
+        Create an empty table.
+        :param size: the number of slots in the table.
+        :param replacement: the replacement policy, REPLACE_ALWAYS or REPLACE_DEPTH.
+        """
+        if size < 1:
+            raise ValueError("Table size must be at least 1, got " + str(size))
+        if replacement not in (self.REPLACE_ALWAYS, self.REPLACE_DEPTH):
+            raise ValueError("Unknown replacement policy: " + str(replacement))
+        self.size = size
+        self.replacement = replacement
+        self.slots = [None] * size
+        self.generation = 0  # Counts the searches started with new_search().
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0  # Stores that replaced a different position.
+        self.rejected = 0  # Stores dropped by the replacement policy.
+
+    def lookup(self, key):
+        """
+        :param key: the position's hash key.
+        :return: the TableEntry for the position, or None if it is not in the table.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def probe(self, key):
+        """
+        Like lookup, but without counting a hit or miss, for looking at the table outside a search.
+        :param key: the position's hash key.
+        :return: the TableEntry for the position, or None if it is not in the table.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, best_col):
+        """
+        Store a searched position, subject to the replacement policy.
+        :param key: the position's hash key.
+        :param depth: the depth the position was searched to.
+        :param score: the score found by the search.
+        :param flag: EXACT, LOWER_BOUND or UPPER_BOUND.
+        :param best_col: the best column found, or None.
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None and entry.key != key:
+            if (self.replacement == self.REPLACE_DEPTH and entry.generation == self.generation and
+                    entry.depth > depth):
+                self.rejected += 1
+                return
+            self.overwrites += 1
+        self.slots[index] = TableEntry(key, depth, score, flag, best_col, self.generation)
+        self.stores += 1
+
+    def new_search(self):
+        """
+        Start a new generation, which any entry stored from now on replaces the older entries of.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters.
+        """
+        self.slots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.rejected = 0
+
+    def get_stats(self):
+        """
+        :return: a dictionary of the table's counters and how full it is.
+        """
+        filled = self.size - self.slots.count(None)
+        probes = self.hits + self.misses
+        return {
+            "size": self.size,
+            "filled": filled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "rejected": self.rejected,
+        }
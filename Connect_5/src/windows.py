@@ -0,0 +1,95 @@
+__author__ = 'Bill'
+
+
+class WindowTable:
+    """
+    Every window of n cells in a line on a board of one size, as bitboard masks laid out
+    the same way as Board's. The windows are worked out once per board size and length
+    and shared by every board, so counting runs or checking for a win is a loop over
+    precomputed masks instead of a bounds-checked walk over the board.
+    """
+
+    # Class Constants
+    TABLES = {}  # Tables already built, keyed by (width, height, n).
+
+    def __init__(self, width, height, n):
+        """
+        Build the table. Use for_geometry() instead, which only builds each table once.
+        :param width: the number of columns on the board.
+        :param height: the number of rows on the board.
+        :param n: the number of cells in each window.
+        """
+        column_bits = height + 1
+        # Each direction is (column step, height step, bitboard shift).
+        directions = ((0, 1, 1), (1, 0, column_bits), (1, 1, column_bits + 1), (1, -1, column_bits - 1))
+        self.n = n
+        self.windows = []  # Mask of every window.
+        self.by_direction = {}  # Masks of the windows in each direction, keyed by shift.
+        self.starting_at = {}  # Mask of each window, keyed by (lowest bit index, shift).
+        self.cell_windows = [[] for cell in range(width * column_bits)]  # (shift, mask) of windows through a cell.
+        for d_col, d_height, shift in directions:
+            self.by_direction[shift] = []
+            for col in range(0, width):
+                for row_height in range(0, height):
+                    end_col = col + d_col * (n - 1)
+                    end_height = row_height + d_height * (n - 1)
+                    if end_col >= width or not 0 <= end_height < height:
+                        continue
+                    cells = [(col + d_col * i) * column_bits + row_height + d_height * i for i in range(0, n)]
+                    mask = 0
+                    for cell in cells:
+                        mask |= 1 << cell
+                    self.windows.append(mask)
+                    self.by_direction[shift].append(mask)
+                    self.starting_at[(min(cells), shift)] = mask
+                    for cell in cells:
+                        self.cell_windows[cell].append((shift, mask))
+
+    @staticmethod
+    def for_geometry(width, height, n):
+        """
+        :param width: the number of columns on the board.
+        :param height: the number of rows on the board.
+        :param n: the number of cells in each window.
+        :return: the WindowTable for the given board size and window length, built on first use.
+        """
+        key = (width, height, n)
+        table = WindowTable.TABLES.get(key)
+        if table is None:
+            table = WindowTable(width, height, n)
+            WindowTable.TABLES[key] = table
+        return table
+
+    @staticmethod
+    def for_lengths(width, height, lengths):
+        """
+        :param width: the number of columns on the board.
+        :param height: the number of rows on the board.
+        :param lengths: the window lengths.
+        :return: a dictionary of the WindowTable for each window length, keyed by length.
+        """
+        tables = {}
+        for n in lengths:
+            tables[n] = WindowTable.for_geometry(width, height, n)
+        return tables
+
+    def count_filled(self, pieces):
+        """
+        :param pieces: a player's bitboard.
+        :return: the number of windows completely filled by the player's pieces.
+        """
+        count = 0
+        for mask in self.windows:
+            if pieces & mask == mask:
+                count += 1
+        return count
+
+    def any_filled(self, pieces):
+        """
+        :param pieces: a player's bitboard.
+        :return: true if any window is completely filled by the player's pieces.
+        """
+        for mask in self.windows:
+            if pieces & mask == mask:
+                return True
+        return False
@@ -0,0 +1,61 @@
+import random
+
+__author__ = 'Bill'
+
+
+class Zobrist:
+    """
+    Random keys used to hash Connect 5 positions. A position's hash is the XOR of
+    the key of every piece on the board, so dropping or removing a piece updates the
+    hash with a single XOR. The keys come from a fixed seed, so a position hashes to
+    the same value in every process.
+    """
+
+    # Class Constants
+    SEED = 5  # Seed used to generate the keys.
+    KEY_BITS = 64  # Size of each key in bits.
+
+    def __init__(self, num_cells, pieces, seed=SEED):
+        """
+        Generate the keys.
+        :param num_cells: the number of cells (bitboard bits) that can hold a piece.
+        :param pieces: the piece values that need keys.
+        :param seed: the seed for the random number generator.
+        """
+        generator = random.Random(seed)
+        self.keys = {}
+        for piece in pieces:
+            self.keys[piece] = [generator.getrandbits(self.KEY_BITS) for i in range(num_cells)]
+        self.to_move = {}
+        for piece in pieces:  # Drawn after the cell keys, so those are the same as without them.
+            self.to_move[piece] = generator.getrandbits(self.KEY_BITS)
+
+    def key(self, piece, cell):
+        """
+        :param piece: the value of the piece.
+        :param cell: the bitboard bit index of the cell.
+        :return: the key for the given piece on the given cell.
+        """
+        return self.keys[piece][cell]
+
+    def to_move_key(self, piece):
+        """
+        :param piece: the value of the piece of the player to move.
+        :return: the key for the given player being the one to move.
+        """
+        return self.to_move[piece]
+
+    def mirrored(self, width, column_bits):
+        """
+        :param width: the number of columns on the board.
+        :param column_bits: the number of bitboard bits each column takes up.
+        :return: a dictionary of lists keyed by piece, where list[cell] is the key of the piece on
+            the cell in the same row of the mirrored column, counting from the other side.
+        """
+        mirrored = {}
+        for piece, keys in self.keys.items():
+            mirrored[piece] = list(keys)
+            for cell in range(0, width * column_bits):
+                col, height = divmod(cell, column_bits)
+                mirrored[piece][cell] = keys[(width - 1 - col) * column_bits + height]
+        return mirrored
@@ -0,0 +1,89 @@
+from src.batch_heuristic import BatchHeuristicFinder, numpy
+from src.board import Board
+from src.heuristicFinder import HeuristicFinder
+import random
+import unittest
+
+__author__ = 'Bill'
+
+
+@unittest.skipIf(numpy is None, "BatchHeuristicFinder requires numpy.")
+class BatchHeuristicTest(unittest.TestCase):
+    """
+    Checks BatchHeuristicFinder against HeuristicFinder and Board's own methods, board
+    for board, over random positions.
+    """
+
+    # Class Constants
+    POSITIONS = 1000  # Random positions checked.
+    GEOMETRY_POSITIONS = 300  # Random positions checked for each other geometry.
+    GEOMETRIES = ((7, 6, 4), (10, 8, 5), (12, 10, 6), (7, 6, 3))  # Geometries other than the default.
+
+    @staticmethod
+    def random_boards(count, seed, geometry=Board.GEOMETRY):
+        """
+        :param count: the number of boards.
+        :param seed: the seed for the random moves.
+        :param geometry: the boards' (width, height, win length).
+        :return: a list of boards with a random number of random moves made, stopping at a win.
+        """
+        generator = random.Random(seed)
+        boards = []
+        for i in range(0, count):
+            board = Board(*geometry)
+            for move in range(0, generator.randrange(0, board.CELLS + 1)):
+                board.drop(Board.PLAYER_ONE if move % 2 == 0 else Board.PLAYER_TWO,
+                           generator.choice(board.legal_moves()))
+                if board.winner_after_last_move() is not None:
+                    break
+            boards.append(board)
+        return boards
+
+    def assert_matches_scalar(self, boards, geometry=Board.GEOMETRY):
+        """
+        Check the batch results for every board against the board's own counts and HeuristicFinder.
+        :param boards: the boards to check.
+        :param geometry: the boards' (width, height, win length).
+        """
+        batch = BatchHeuristicFinder(Board.PLAYER_ONE, Board.PLAYER_TWO, geometry)
+        finder = HeuristicFinder(Board.PLAYER_ONE, Board.PLAYER_TWO)
+        result = batch.evaluate(boards)
+        for i, board in enumerate(boards):
+            self.assertEqual(result["heuristic"][i], finder.heuristic(board), str(board))
+            winner = board.find_winner()
+            self.assertEqual(result["winner"][i], BatchHeuristicFinder.CODES[winner] if winner else 0)
+            for piece in (Board.PLAYER_ONE, Board.PLAYER_TWO):
+                for n in board.TRACKED_RUNS:
+                    self.assertEqual(result["n_in_a_row"][piece][n][i], board.find_n_in_a_row(piece, n))
+                self.assertEqual(result["disconnected_wins"][piece][i], board.find_disconnected_wins(piece))
+
+    def test_matches_scalar(self):
+        self.assert_matches_scalar(self.random_boards(self.POSITIONS, 5))
+
+    def test_other_geometries(self):
+        for geometry in self.GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                self.assert_matches_scalar(self.random_boards(self.GEOMETRY_POSITIONS, 7, geometry), geometry)
+
+    def test_corner_on_larger_board(self):
+        board = Board(10, 8, 5)
+        board.drop(Board.PLAYER_ONE, 9)
+        batch = BatchHeuristicFinder(Board.PLAYER_TWO, Board.PLAYER_ONE, board.get_geometry())
+        self.assertEqual(list(batch.heuristic([board])), [HeuristicFinder(Board.PLAYER_TWO, Board.PLAYER_ONE)
+                                                           .heuristic(board)])
+
+    def test_wrong_geometry(self):
+        batch = BatchHeuristicFinder(Board.PLAYER_ONE, Board.PLAYER_TWO)
+        with self.assertRaises(ValueError):
+            batch.heuristic([Board(10, 8, 5)])
+        with self.assertRaises(ValueError):
+            batch.heuristic(numpy.zeros((1, 10, 8), dtype=numpy.int8))
+
+    def test_array_input(self):
+        boards = self.random_boards(50, 6)
+        batch = BatchHeuristicFinder(Board.PLAYER_TWO, Board.PLAYER_ONE)
+        self.assertEqual(list(batch.heuristic(BatchHeuristicFinder.to_array(boards))), list(batch.heuristic(boards)))
+
+
+if __name__ == "__main__":
+    unittest.main()
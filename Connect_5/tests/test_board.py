@@ -0,0 +1,94 @@
+from src.board import Board
+import pickle
+import random
+import unittest
+
+__author__ = 'Bill'
+
+
+class BoardCountsTest(unittest.TestCase):
+    """
+    Checks the run and disconnected win counts drop and undo keep up to date against
+    scans of the whole board, over random games with moves taken back along the way.
+    """
+
+    # Class Constants
+    GAMES = 20  # Random games played on each geometry.
+    UNDO_CHANCE = 0.3  # Chance of taking back a move after each drop.
+    GEOMETRIES = ((9, 7, 5), (7, 6, 4), (10, 8, 5), (12, 10, 6))
+
+    def assert_counts(self, board):
+        """
+        :param board: the board to check.
+        """
+        for piece in (Board.PLAYER_ONE, Board.PLAYER_TWO):
+            for n in board.TRACKED_RUNS:
+                self.assertEqual(board.get_run_count(piece, n), board.find_n_in_a_row(piece, n),
+                                 "runs of %d for %s on\n%s" % (n, piece, board))
+            self.assertEqual(board.get_disconnected_wins(piece), board.find_disconnected_wins(piece),
+                             "disconnected wins for %s on\n%s" % (piece, board))
+
+    def play_random_games(self, geometry, seed):
+        """
+        Play random games, checking the counts after every drop and undo.
+        :param geometry: the board's (width, height, win length).
+        :param seed: the seed for the random moves.
+        """
+        generator = random.Random(seed)
+        for game in range(0, self.GAMES):
+            board = Board(*geometry)
+            while not board.is_filled():
+                piece = Board.PLAYER_ONE if generator.random() < 0.5 else Board.PLAYER_TWO
+                board.drop(piece, generator.choice(board.legal_moves()))
+                self.assert_counts(board)
+                self.assertEqual(board.winner_after_last_move() is not None, board.find_winner() is not None)
+                if board.find_winner() is not None:
+                    break
+                if generator.random() < self.UNDO_CHANCE:
+                    board.undo()
+                    self.assert_counts(board)
+
+    def test_default_geometry(self):
+        self.play_random_games(Board.GEOMETRY, 7)
+
+    def test_other_geometries(self):
+        for geometry in self.GEOMETRIES[1:]:
+            with self.subTest(geometry=geometry):
+                self.play_random_games(geometry, 11)
+
+    def test_undo_restores_board(self):
+        generator = random.Random(3)
+        for geometry in self.GEOMETRIES:
+            board = Board(*geometry)
+            states = []
+            while not board.is_filled():
+                states.append((str(board), board.get_key(), board.get_mirror_key(), list(board.heights)))
+                board.drop(Board.PLAYER_ONE if len(board.moves) % 2 else Board.PLAYER_TWO,
+                           generator.choice(board.legal_moves()))
+            while states:
+                board.undo()
+                self.assertEqual((str(board), board.get_key(), board.get_mirror_key(), list(board.heights)),
+                                 states.pop())
+            self.assertIsNone(board.undo())
+            self.assert_counts(board)
+
+    def test_pickle(self):
+        generator = random.Random(5)
+        for geometry in self.GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                board = Board(*geometry)
+                for move in range(0, 12):
+                    board.drop(Board.PLAYER_ONE if move % 2 == 0 else Board.PLAYER_TWO,
+                               generator.choice(board.legal_moves()))
+                copy = pickle.loads(pickle.dumps(board))
+                self.assertIs(type(copy), type(board))
+                self.assertEqual((str(copy), copy.get_moves(), copy.get_key(), copy.get_mirror_key()),
+                                 (str(board), board.get_moves(), board.get_key(), board.get_mirror_key()))
+                self.assertEqual(copy.winner_after_last_move(), board.winner_after_last_move())
+                self.assert_counts(copy)
+                copy.undo()
+                self.assert_counts(copy)
+
+
+if __name__ == "__main__":
+    unittest.main()
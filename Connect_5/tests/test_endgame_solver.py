@@ -0,0 +1,95 @@
+from src.board import Board
+from src.endgame_solver import EndgameSolver
+import random
+import unittest
+
+__author__ = 'Bill'
+
+
+def random_position(generator, geometry, moves):
+    """
+    :param generator: the random number generator.
+    :param geometry: the board's (width, height, win length).
+    :param moves: the number of moves to make.
+    :return: a board with random moves made and the piece of the player to move, or None if a
+        move won the game.
+    """
+    board = Board(*geometry)
+    piece = Board.PLAYER_ONE
+    for move in range(0, moves):
+        board.drop(piece, generator.choice(board.legal_moves()))
+        piece = Board.OPPONENT[piece]
+        if board.winner_after_last_move() is not None:
+            return None
+    return board, piece
+
+
+def negamax(board, piece, memo):
+    """
+    A plain negamax over the whole game tree, scored like EndgameSolver.
+    :param board: the board, which is restored before returning. The last move on it must not
+        have won the game.
+    :param piece: the piece of the player to move.
+    :param memo: a dictionary of scores already found, keyed by position.
+    :return: the exact score of the position for the player to move.
+    """
+    key = (board.get_key(), piece)
+    if key not in memo:
+        empty = EndgameSolver.empty_cells(board)
+        best = 0 if board.is_filled() else None
+        for col in board.legal_moves():
+            board.drop(piece, col)
+            if board.winner_after_last_move() == piece:
+                score = empty
+            else:
+                score = -negamax(board, Board.OPPONENT[piece], memo)
+            board.undo()
+            if best is None or score > best:
+                best = score
+        memo[key] = best
+    return memo[key]
+
+
+class EndgameSolverTest(unittest.TestCase):
+    """
+    Checks EndgameSolver's scores, moves and distances against a plain negamax on small
+    boards and near-full default boards.
+    """
+
+    # Class Constants
+    POSITIONS = 30  # Random positions checked on each geometry.
+    # (width, height, win length) and the number of blank cells left in the positions.
+    CASES = (((4, 4, 3), 13), ((5, 4, 4), 12), ((6, 5, 4), 11), ((9, 7, 5), 10))
+
+    def test_matches_negamax(self):
+        generator = random.Random(17)
+        solver = EndgameSolver()
+        for geometry, empty in self.CASES:
+            with self.subTest(geometry=geometry):
+                checked = 0
+                while checked < self.POSITIONS:
+                    cells = geometry[0] * geometry[1]
+                    position = random_position(generator, geometry, cells - generator.randint(1, empty))
+                    if position is None:
+                        continue
+                    board, piece = position
+                    checked += 1
+                    memo = {}
+                    col, score = solver.solve(board, piece)
+                    self.assertEqual(score, negamax(board, piece, memo), str(board))
+
+                    # The move keeps the score, and each move brings the end one move closer.
+                    distance = EndgameSolver.distance(board, score)
+                    self.assertEqual(distance is None, score == 0)
+                    board.drop(piece, col)
+                    if board.winner_after_last_move() == piece:
+                        self.assertEqual(distance, 1, str(board))
+                    else:
+                        self.assertEqual(-negamax(board, Board.OPPONENT[piece], memo), score, str(board))
+                        if distance is not None:
+                            self.assertEqual(EndgameSolver.distance(board, -score), distance - 1, str(board))
+                    board.undo()
+
+
+if __name__ == "__main__":
+    unittest.main()
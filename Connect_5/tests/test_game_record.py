@@ -0,0 +1,145 @@
+from src.board import Board
+from src.game_record import GameRecord, GameRecordReader, GameRecordWriter
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+__author__ = 'Bill'
+
+
+class GameRecordTest(unittest.TestCase):
+    """
+    Checks that games written to a game record file read back the same, with and without
+    stats, packed two moves to a byte or one, and after adding to a file, including one
+    whose writer never closed and whose last game was cut off.
+    """
+
+    # Class Constants
+    GAMES = 25  # Random games written to each file.
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "games.c5r")
+        self.generator = random.Random(9)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def random_games(self, count, geometry=Board.GEOMETRY, stats=False):
+        """
+        :param count: the number of games.
+        :param geometry: the board's (width, height, win length).
+        :param stats: true to give every other move search stats.
+        :return: a list of GameRecords of random games, some of them cut short as unfinished.
+        """
+        records = []
+        for game in range(0, count):
+            board = Board(*geometry)
+            first_player = self.generator.choice((Board.PLAYER_ONE, Board.PLAYER_TWO))
+            piece = first_player
+            limit = self.generator.choice((board.CELLS, self.generator.randrange(0, board.CELLS)))
+            while len(board.get_moves()) < limit and GameRecord.result_of(board) == GameRecord.UNFINISHED:
+                board.drop(piece, self.generator.choice(board.legal_moves()))
+                piece = Board.OPPONENT[piece]
+            moves = [col for piece, col in board.get_moves()]
+            move_stats = None
+            if stats:
+                # Scores that a 32 bit float holds exactly.
+                move_stats = [(self.generator.randrange(-2000, 2000) / 2.0, self.generator.randrange(1, 12),
+                               self.generator.randrange(0, 1 << 32)) if index % 2 else None
+                              for index in range(0, len(moves))]
+            records.append(GameRecord(first_player, moves, GameRecord.result_of(board), move_stats))
+        return records
+
+    def assert_games(self, reader, records, stats=False):
+        """
+        :param reader: an open GameRecordReader.
+        :param records: the GameRecords that should be in the file, in order.
+        :param stats: true if the file keeps stats.
+        """
+        self.assertEqual(len(reader), len(records))
+        expected = [(record.first_player, record.moves, record.result,
+                     (record.stats or [None] * len(record.moves)) if stats else None) for record in records]
+        found = [(record.first_player, record.moves, record.result, record.stats) for record in reader.games()]
+        self.assertEqual(found, expected)
+        for index in (0, len(records) // 2, len(records) - 1):
+            record = reader.game(index)
+            self.assertEqual((record.first_player, record.moves, record.result, record.stats), expected[index])
+
+    def write(self, records, geometry=Board.GEOMETRY, stats=False):
+        """
+        Write games to the file and close it.
+        :param records: the GameRecords to write.
+        :param geometry: the board's (width, height, win length).
+        :param stats: true to keep stats.
+        """
+        with GameRecordWriter(self.path, geometry, stats) as writer:
+            for record in records:
+                writer.write_game(record)
+
+    def test_round_trip(self):
+        for stats in (False, True):
+            with self.subTest(stats=stats):
+                records = self.random_games(self.GAMES, stats=stats)
+                self.write(records, stats=stats)
+                with GameRecordReader(self.path) as reader:
+                    self.assertIsNotNone(reader.index_offset)
+                    self.assertEqual(bool(reader.flags & GameRecord.FLAG_STATS), stats)
+                    self.assert_games(reader, records, stats)
+                    self.assertEqual(reader.game(3).replay().get_moves(), records[3].get_moves())
+                os.remove(self.path)
+
+    def test_move_packing(self):
+        # 15 columns still fit in four bits, 16 need a byte each.
+        for geometry, nibbles in (((15, 6, 5), True), ((16, 6, 5), False), ((40, 4, 4), False)):
+            with self.subTest(geometry=geometry):
+                records = self.random_games(self.GAMES, geometry, stats=True)
+                self.write(records, geometry, stats=True)
+                with GameRecordReader(self.path) as reader:
+                    self.assertEqual(bool(reader.flags & GameRecord.FLAG_NIBBLES), nibbles)
+                    self.assertEqual(reader.geometry, geometry)
+                    self.assert_games(reader, records, stats=True)
+                    self.assertEqual(reader.game_size(5), GameRecord.GAME_HEADER.size + (3 if nibbles else 5) +
+                                     5 * GameRecord.STATS.size)
+                os.remove(self.path)
+
+    def test_append_to_indexed_file(self):
+        records = self.random_games(self.GAMES)
+        self.write(records[:10])
+        self.write(records[10:])
+        with GameRecordReader(self.path) as reader:
+            self.assertIsNotNone(reader.index_offset)
+            self.assert_games(reader, records)
+        with self.assertRaises(ValueError):
+            GameRecordWriter(self.path, stats=True)
+        with self.assertRaises(ValueError):
+            GameRecordWriter(self.path, (7, 6, 4))
+
+    def test_unclosed_file(self):
+        records = self.random_games(10, stats=True)
+        writer = GameRecordWriter(self.path, stats=True)
+        for record in records:
+            writer.write_game(record)
+        writer.start_game(Board.PLAYER_ONE)
+        writer.add_move(4, 1.5, 3, 100)
+        writer.file.write(GameRecord.GAME_HEADER.pack(60, 1, 0) + bytes(200))  # A game cut off part way.
+        writer.file.close()  # Stops without writing the game being played or the index.
+
+        with GameRecordReader(self.path) as reader:
+            self.assertIsNone(reader.index_offset)
+            self.assert_games(reader, records, stats=True)
+        with GameRecordWriter(self.path, stats=True) as writer:  # Drops the cut off game.
+            self.assertEqual(len(writer), 10)
+            writer.start_game(Board.PLAYER_TWO)
+            writer.add_move(2)
+            writer.add_move(3, -4.0, 5, 7)
+        records.append(GameRecord(Board.PLAYER_TWO, [2, 3], GameRecord.UNFINISHED, [None, (-4.0, 5, 7)]))
+        with GameRecordReader(self.path) as reader:
+            self.assertIsNotNone(reader.index_offset)
+            self.assert_games(reader, records, stats=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+from src.board import Board
+from src.minimax import MiniMax
+import unittest
+
+__author__ = 'Bill'
+
+
+class MiniMaxCancelTest(unittest.TestCase):
+    """
+    Checks that a cancel() made before a search starts is not lost.
+    """
+
+    # Class Constants
+    TIME_BUDGET_MS = 60000  # Long enough that only a cancel stops the search.
+    MAX_DEPTH = 8
+
+    def test_cancel_before_search(self):
+        minimax = MiniMax(Board.PLAYER_ONE, Board.PLAYER_TWO)
+        minimax.cancel()
+        result = minimax.search(Board(), self.TIME_BUDGET_MS, self.MAX_DEPTH)
+        self.assertLess(result.get_depth() or 0, self.MAX_DEPTH)
+
+    def test_reset_cancel(self):
+        minimax = MiniMax(Board.PLAYER_ONE, Board.PLAYER_TWO)
+        minimax.cancel()
+        minimax.reset_cancel()
+        result = minimax.search(Board(), self.TIME_BUDGET_MS, 3)
+        self.assertEqual(result.get_depth(), 3)
+        self.assertIsNotNone(result.get_best_col())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+from src.board import Board
+from src.opening_book import OpeningBook, OpeningBookBuilder
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+__author__ = 'Bill'
+
+
+class OpeningBookTest(unittest.TestCase):
+    """
+    Checks that books that can't be read are skipped and that writing a book replaces it whole.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "opening_book.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def open_default(self):
+        """
+        :return: what OpeningBook.open_default returns for the book at self.path, and what it wrote
+            to stderr.
+        """
+        errors = io.StringIO()
+        with unittest.mock.patch.object(OpeningBook, "DEFAULT_PATH", self.path), \
+                unittest.mock.patch("sys.stderr", errors):
+            book = OpeningBook.open_default()
+        return book, errors.getvalue()
+
+    def test_missing_book(self):
+        self.assertEqual(self.open_default(), (None, ""))
+
+    def test_unreadable_books_are_skipped(self):
+        old_header = OpeningBook.HEADER.pack(OpeningBook.MAGIC, 1, Board.get_length(), Board.get_height(),
+                                             Board.SCORE_TO_WIN, 0)
+        truncated = OpeningBook.HEADER.pack(OpeningBook.MAGIC, OpeningBook.VERSION, Board.get_length(),
+                                            Board.get_height(), Board.SCORE_TO_WIN, 3)
+        for contents in (b"", b"C5", old_header, truncated):
+            with self.subTest(contents=contents):
+                with open(self.path, "wb") as out:
+                    out.write(contents)
+                book, errors = self.open_default()
+                self.assertIsNone(book)
+                self.assertIn(self.path, errors)
+
+    def test_write_replaces_open_book(self):
+        board = Board()
+        key = OpeningBook.position_key(board, Board.PLAYER_ONE)
+        OpeningBookBuilder.write({key: (4, 6, 1.5)}, self.path)
+        with OpeningBook(self.path) as book:
+            OpeningBookBuilder.write({key: (3, 8, 2.5)}, self.path)
+            self.assertEqual(book.probe(board, Board.PLAYER_ONE), (4, 6, 1.5))  # The open book is unchanged.
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.probe(board, Board.PLAYER_ONE), (3, 8, 2.5))
+        self.assertEqual(os.listdir(self.folder), ["opening_book.bin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
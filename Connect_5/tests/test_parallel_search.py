@@ -0,0 +1,54 @@
+from src.board import Board
+from src.board_node import BoardNode
+from src.minimax import MiniMax
+from src.parallel_search import ParallelMiniMax
+import random
+import unittest
+
+__author__ = 'Bill'
+
+
+class ParallelSearchTest(unittest.TestCase):
+    """
+    Checks that ParallelMiniMax picks the same move as the serial MiniMax search at the
+    same depth, over random positions with the AI to move.
+    """
+
+    # Class Constants
+    POSITIONS = 12  # Random positions checked.
+    DEPTHS = (1, 2, 4)  # Depths each position is searched to.
+    WORKERS = 2  # Worker processes of the parallel search.
+
+    @staticmethod
+    def random_boards(count, seed):
+        """
+        :param count: the number of boards.
+        :param seed: the seed for the random moves.
+        :return: a list of boards with an odd number of random moves made and no winner, so the
+            second player is to move.
+        """
+        generator = random.Random(seed)
+        boards = []
+        while len(boards) < count:
+            board = Board()
+            for move in range(0, 2 * generator.randrange(0, 12) + 1):
+                board.drop(Board.PLAYER_ONE if move % 2 == 0 else Board.PLAYER_TWO,
+                           generator.choice(board.legal_moves()))
+            if board.find_winner() is None:
+                boards.append(board)
+        return boards
+
+    def test_matches_serial(self):
+        with ParallelMiniMax(Board.PLAYER_ONE, Board.PLAYER_TWO, self.WORKERS) as parallel:
+            for board in self.random_boards(self.POSITIONS, 11):
+                for depth in self.DEPTHS:
+                    serial = MiniMax(Board.PLAYER_ONE, Board.PLAYER_TWO)
+                    node = serial.mini_max(BoardNode(board, MiniMax.NEG_INF), MiniMax.NEG_INF, MiniMax.INF, depth)
+                    result = parallel.search(board, depth)
+                    self.assertEqual(result.get_best_col(), node.get_board().get_last_move()[1],
+                                     str(board) + " depth " + str(depth))
+                    self.assertEqual(result.get_score(), node.get_heuristic(), str(board) + " depth " + str(depth))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+from src.board import Board
+from src.threats import ThreatFinder
+import random
+import unittest
+
+__author__ = 'Bill'
+
+
+class ThreatFinderTest(unittest.TestCase):
+    """
+    Checks that the moves ThreatFinder decides really win or block, and that the moves it
+    leaves out of the search really lose straight away, over random default boards.
+    """
+
+    # Class Constants
+    POSITIONS = 1500  # Random positions checked.
+    MAX_MOVES = 40  # Most random moves made before a position is checked.
+
+    @staticmethod
+    def random_position(generator, moves):
+        """
+        :param generator: the random number generator.
+        :param moves: the number of moves to make.
+        :return: a default board with random moves made and the piece of the player to move, or
+            None if a move won the game or filled the board.
+        """
+        board = Board()
+        piece = Board.PLAYER_ONE
+        for move in range(0, moves):
+            board.drop(piece, generator.choice(board.legal_moves()))
+            piece = Board.OPPONENT[piece]
+            if board.winner_after_last_move() is not None:
+                return None
+        if board.is_filled():
+            return None
+        return board, piece
+
+    @staticmethod
+    def wins_next(board, piece):
+        """
+        :param board: the board.
+        :param piece: the piece of the player to move.
+        :return: true if the player can win with their next piece.
+        """
+        for col in board.legal_moves():
+            board.drop(piece, col)
+            won = board.winner_after_last_move() == piece
+            board.undo()
+            if won:
+                return True
+        return False
+
+    def test_decided_moves(self):
+        generator = random.Random(23)
+        reasons = set()
+        checked = 0
+        while checked < self.POSITIONS:
+            position = self.random_position(generator, generator.randint(0, self.MAX_MOVES))
+            if position is None:
+                continue
+            board, ai = position
+            human = Board.OPPONENT[ai]
+            checked += 1
+            col, found = ThreatFinder(human, ai).check(board)
+            moves = str(board.get_moves())
+            if col is None:
+                # Every move left out lets the human win straight away.
+                for move in set(board.legal_moves()) - set(found):
+                    board.drop(ai, move)
+                    self.assertTrue(self.wins_next(board, human), moves + " move " + str(move))
+                    board.undo()
+                continue
+            reasons.add(found)
+            board.drop(ai, col)
+            if found == ThreatFinder.WIN:
+                self.assertEqual(board.winner_after_last_move(), ai, moves)
+            elif found == ThreatFinder.BLOCK:
+                board.undo()
+                self.assertFalse(self.wins_next(board, ai), moves)
+                board.drop(human, col)
+                self.assertEqual(board.winner_after_last_move(), human, moves)
+            elif found == ThreatFinder.DOUBLE_THREAT:
+                # Whatever the human plays, they don't win and the AI wins next.
+                self.assertIsNone(board.winner_after_last_move(), moves)
+                for reply in board.legal_moves():
+                    board.drop(human, reply)
+                    self.assertIsNone(board.winner_after_last_move(), moves + " reply " + str(reply))
+                    self.assertTrue(self.wins_next(board, ai), moves + " reply " + str(reply))
+                    board.undo()
+            elif found == ThreatFinder.ONLY_MOVE:
+                board.undo()
+                for move in board.legal_moves():
+                    if move != col:
+                        board.drop(ai, move)
+                        self.assertTrue(self.wins_next(board, human), moves + " move " + str(move))
+                        board.undo()
+                board.drop(ai, col)
+            board.undo()
+        # Forced moves are too rare in random positions to count on, but they are checked when found.
+        self.assertLessEqual({ThreatFinder.WIN, ThreatFinder.BLOCK, ThreatFinder.DOUBLE_THREAT}, reasons)
+
+
+if __name__ == "__main__":
+    unittest.main()
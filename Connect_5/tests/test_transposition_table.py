@@ -0,0 +1,37 @@
+from src.transposition_table import TranspositionTable
+import unittest
+
+__author__ = 'Bill'
+
+
+class TranspositionTableTest(unittest.TestCase):
+    """
+    Checks the depth replacement policy within a search and across searches.
+    """
+
+    # Class Constants
+    SIZE = 16  # Slots, keys SIZE apart share a slot.
+
+    def test_deeper_entry_kept_within_search(self):
+        table = TranspositionTable(self.SIZE)
+        table.new_search()
+        table.store(1, 6, 10.0, TranspositionTable.EXACT, 3)
+        table.store(1 + self.SIZE, 2, 5.0, TranspositionTable.EXACT, 4)
+        self.assertIsNotNone(table.probe(1))
+        self.assertIsNone(table.probe(1 + self.SIZE))
+        self.assertEqual(table.rejected, 1)
+
+    def test_older_entry_replaced(self):
+        table = TranspositionTable(self.SIZE)
+        table.new_search()
+        table.store(1, 6, 10.0, TranspositionTable.EXACT, 3)
+        table.new_search()
+        self.assertIsNotNone(table.probe(1))  # Old entries can still be used until they are replaced.
+        table.store(1 + self.SIZE, 2, 5.0, TranspositionTable.EXACT, 4)
+        self.assertIsNone(table.probe(1))
+        self.assertEqual(table.probe(1 + self.SIZE).generation, table.generation)
+        self.assertEqual(table.rejected, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()